@@ -0,0 +1 @@
+"""Performance benchmarks for bonded, run with python -m benchmarks"""
@@ -0,0 +1,140 @@
+"""Time each phase of bonded against synthetic projects of growing size
+
+Usage: python -m benchmarks [--sizes 100,1000,10000] [--json results.json]
+
+Every size builds a fresh project and environment, with the number of distributions
+growing alongside the number of files, and reports how long each phase took. Time per file
+that rises with size points at something scaling worse than linearly.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+from rich import print
+from rich.table import Table
+
+from bonded import _internal
+from bonded.__main__ import iter_source_files
+from bonded._importlib import Environment
+from bonded.display import display_report
+from bonded.evaluation import evaluate_bonds, executables_to_inspect
+from bonded.executable_inspection import ExecutableInspection
+from bonded.module_inspection import ModuleInspection
+from bonded.package_inspection import PackageInspection
+from bonded.settings import Settings
+from bonded.timings import Timings
+
+from .synthetic import _distribution_name, generate_site_packages, generate_tree
+
+
+PHASES = [
+    'iter_source_files',
+    'find_imports_from_token',
+    'inspect_executables',
+    'PackageInspection',
+    'Evaluation',
+    'display',
+]
+
+
+def run_phases(root, distributions):
+    """Run bonded against the project and environment under `root`, timing each phase"""
+    _internal._record_cache.clear()
+    timings = Timings()
+    settings = Settings(search_path=os.path.join(root, 'project'), report='table')
+    environment = Environment(os.path.join(root, 'env'))
+
+    with timings.phase('iter_source_files'):
+        all_files = list(iter_source_files(settings.search_path, settings.exclude, '*'))
+        python_files = [path for path in all_files if path.suffix == '.py']
+    with timings.phase('find_imports_from_token'):
+        modules = ModuleInspection()
+        modules.inspect_imports(python_files)
+    with timings.phase('PackageInspection'):
+        packages = PackageInspection(
+            [_distribution_name(number) for number in range(distributions)], environment
+        )
+        for package in packages.values():
+            package.extends
+    with timings.phase('inspect_executables'):
+        executables = ExecutableInspection(executables_to_inspect(settings, modules, packages))
+        executables.inspect_executables(all_files)
+    with timings.phase('Evaluation'):
+        evaluation = evaluate_bonds(settings, modules, packages, executables)
+        evaluation.passes()
+    with timings.phase('display'), contextlib.redirect_stdout(io.StringIO()):
+        display_report(settings, evaluation)
+    return {name: timings.phases[name][0] for name in PHASES}, len(python_files)
+
+
+def run(sizes, import_density, vendored, large_files, binary_blobs):
+    results = []
+    for size in sizes:
+        distributions = max(size // 10, 10)
+        with tempfile.TemporaryDirectory() as root:
+            generate_tree(
+                root,
+                files=size,
+                import_density=import_density,
+                # the rest can only be found used through their executables
+                distributions=distributions // 2,
+                vendored=vendored,
+                large_files=large_files,
+                binary_blobs=binary_blobs,
+            )
+            generate_site_packages(os.path.join(root, 'env'), distributions=distributions)
+            phases, files = run_phases(root, distributions)
+        results.append(
+            {'size': size, 'python_files': files, 'distributions': distributions, 'phases': phases}
+        )
+    return results
+
+
+def display_results(results):
+    table = Table(title='Seconds per phase (microseconds per python file)')
+    table.add_column('Phase')
+    for result in results:
+        table.add_column(f"{result['size']} files", justify='right')
+    for phase in PHASES:
+        cells = []
+        for result in results:
+            seconds = result['phases'][phase]
+            cells.append(f"{seconds:.3f} ({seconds * 1e6 / result['python_files']:.0f})")
+        table.add_row(phase, *cells)
+    print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument(
+        '--sizes',
+        default='100,1000,5000',
+        help='Comma separated numbers of python files to generate',
+    )
+    parser.add_argument('--import-density', type=int, default=5, help='Imports per file')
+    parser.add_argument('--vendored', type=int, default=2, help='Vendored package copies')
+    parser.add_argument('--large-files', type=int, default=1, help='Large generated files')
+    parser.add_argument('--binary-blobs', type=int, default=2, help='1MiB binary files')
+    parser.add_argument('--json', help='Also write the results as JSON to this file')
+    arguments = parser.parse_args()
+
+    results = run(
+        [int(size) for size in arguments.sizes.split(',')],
+        arguments.import_density,
+        arguments.vendored,
+        arguments.large_files,
+        arguments.binary_blobs,
+    )
+    display_results(results)
+    if arguments.json:
+        with open(arguments.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
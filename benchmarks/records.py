@@ -0,0 +1,62 @@
+"""Measure the memory and attribute access cost of module records
+
+Usage: python -m benchmarks.records [number of distinct imported names]
+
+Records are compared with the dict-backed layout they used to have: two bools, a set and
+their evidence per module. Reading which kinds of import were found is timed the way
+evaluation reads it.
+"""
+import sys
+import timeit
+import tracemalloc
+
+from bonded import _internal
+from bonded._evidence import Evidence
+from bonded.module_inspection import Found, Module
+
+
+class DictModule(_internal._Record):
+    def __init__(self, module_name):
+        super().__init__(module_name)
+        self.found_import_stmt = False
+        self.found_import_fun = False
+        self.imported_names = set()
+        self.found_imports = Evidence()
+
+
+_ANY_IMPORT = int(Found.IMPORT_STATEMENT | Found.IMPORT_FUNCTION)
+
+
+def read_dict_module(record):
+    return record.found_import_stmt or record.found_import_fun
+
+
+def read_module(record):
+    return record.found & _ANY_IMPORT
+
+
+def measure(record_class, read, names):
+    _internal._record_cache.clear()
+    tracemalloc.start()
+    records = [record_class(name) for name in names]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    access = min(timeit.repeat(lambda: [read(record) for record in records], number=5, repeat=3))
+    _internal._record_cache.clear()
+    return size, access
+
+
+def main(count):
+    names = [f'module_{i}' for i in range(count)]
+    results = {
+        cls.__name__: measure(cls, read, names)
+        for cls, read in ((DictModule, read_dict_module), (Module, read_module))
+    }
+    for name, (size, access) in results.items():
+        print(f'{name:>10}: {size / count:8.1f} bytes/record, {access * 1e3:8.2f} ms to read all')
+    (old_size, _), (new_size, _) = results.values()
+    print(f'{"saving":>10}: {1 - new_size / old_size:8.1%}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
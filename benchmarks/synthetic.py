@@ -0,0 +1,141 @@
+"""Generate synthetic projects and environments of any size to benchmark against
+
+Everything is derived from a seed, so the same arguments always build the same tree
+"""
+import os
+import random
+
+
+STDLIB_IMPORTS = ['os', 'sys', 're', 'json', 'logging', 'typing', 'collections', 'itertools']
+
+
+def _distribution_name(number):
+    return f'dist-{number:05}'
+
+
+def _module_name(number):
+    return f'dist_{number:05}'
+
+
+def generate_tree(
+    root,
+    files=100,
+    import_density=5,
+    distributions=50,
+    vendored=0,
+    large_files=0,
+    large_file_lines=50_000,
+    binary_blobs=0,
+    binary_blob_size=1 << 20,
+    seed=0,
+):
+    """Write a project of `files` python modules, spread over nested packages, under `root`
+
+    Each module has about `import_density` imports, of the standard library, of other project
+    modules and of the modules of the first `distributions` generated distributions. There are
+    also `vendored` copies of the project's first package, `large_files` generated modules of
+    `large_file_lines` lines, `binary_blobs` files of random bytes and a tox.ini and Makefile
+    running the distributions' scripts.
+    """
+    rng = random.Random(seed)
+    project = os.path.join(root, 'project')
+    packages = [project]
+    for number in range(max(files // 20, 1)):
+        package = os.path.join(rng.choice(packages), f'package_{number}')
+        os.makedirs(package)
+        with open(os.path.join(package, '__init__.py'), 'w') as init:
+            init.write('')
+        packages.append(package)
+    for number in range(files):
+        imports = []
+        for _ in range(import_density):
+            kind = rng.random()
+            if kind < 0.3:
+                imports.append(f'import {rng.choice(STDLIB_IMPORTS)}')
+            elif kind < 0.5:
+                imports.append(f'from project import module_{rng.randrange(files)}')
+            elif kind < 0.9 and distributions:
+                imports.append(f'import {_module_name(rng.randrange(distributions))}')
+            elif distributions:
+                imports.append(
+                    f'importlib.import_module("{_module_name(rng.randrange(distributions))}")'
+                )
+        body = '\n'.join(
+            [
+                '"""A generated module"""',
+                'import importlib',
+                *imports,
+                '',
+                f'def function_{number}(argument):',
+                '    return [value * 2 for value in argument if value]',
+                '',
+            ]
+        )
+        with open(os.path.join(rng.choice(packages), f'module_{number}.py'), 'w') as module:
+            module.write(body)
+    for number in range(vendored):
+        vendor = os.path.join(project, '_vendor', f'copy_{number}')
+        os.makedirs(vendor)
+        for name in os.listdir(packages[-1]):
+            if name.endswith('.py'):
+                with open(os.path.join(packages[-1], name)) as original:
+                    with open(os.path.join(vendor, name), 'w') as copy:
+                        copy.write(original.read())
+    for number in range(large_files):
+        with open(os.path.join(project, f'generated_{number}.py'), 'w') as generated:
+            generated.write('import json\n')
+            for line in range(large_file_lines):
+                generated.write(f'CONSTANT_{line} = {{"key": {line}, "value": "{line:x}"}}\n')
+    for number in range(binary_blobs):
+        with open(os.path.join(project, f'blob_{number}.bin'), 'wb') as blob:
+            blob.write(rng.randbytes(binary_blob_size))
+    scripts = [f'{_distribution_name(number)}-cli' for number in range(distributions)]
+    with open(os.path.join(root, 'tox.ini'), 'w') as tox:
+        tox.write('[testenv]\ncommands =\n' + ''.join(f'    {script}\n' for script in scripts))
+    with open(os.path.join(root, 'Makefile'), 'w') as makefile:
+        makefile.write('all:\n' + ''.join(f'\t{script} --check\n' for script in scripts))
+    return root
+
+
+def generate_site_packages(root, distributions=50, entry_points=2, scripts=1, seed=0):
+    """Write an environment of `distributions` installed distributions under `root`
+
+    Each distribution provides one top-level module, `entry_points` plugin entry points, a
+    console script and `scripts` further executables in bin. Every distribution requires a
+    few of those after it, so they form a dependency graph.
+    """
+    rng = random.Random(seed)
+    site_packages = os.path.join(root, 'lib', 'python3.99', 'site-packages')
+    bin_directory = os.path.join(root, 'bin')
+    os.makedirs(site_packages)
+    os.makedirs(bin_directory)
+    for number in range(distributions):
+        name = _distribution_name(number)
+        module = _module_name(number)
+        requires = sorted(
+            {_distribution_name(rng.randrange(number + 1, distributions)) for _ in range(3)}
+            if number + 1 < distributions
+            else set()
+        )
+        dist_info = os.path.join(site_packages, f'{module}-1.0.dist-info')
+        os.makedirs(dist_info)
+        os.makedirs(os.path.join(site_packages, module))
+        record = [f'{module}/__init__.py,,', f'{module}-1.0.dist-info/METADATA,,']
+        with open(os.path.join(site_packages, module, '__init__.py'), 'w') as init:
+            init.write('def main():\n    pass\n')
+        with open(os.path.join(dist_info, 'METADATA'), 'w') as metadata:
+            metadata.write(f'Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n')
+            metadata.writelines(f'Requires-Dist: {requirement}\n' for requirement in requires)
+        with open(os.path.join(dist_info, 'entry_points.txt'), 'w') as entry_points_file:
+            entry_points_file.write(f'[console_scripts]\n{name}-cli = {module}:main\n')
+            for entry_point in range(entry_points):
+                entry_points_file.write(f'\n[plugins_{entry_point}]\n{name} = {module}:main\n')
+        for script in [f'{name}-cli', *(f'{name}-tool-{i}' for i in range(scripts))]:
+            path = os.path.join(bin_directory, script)
+            with open(path, 'w') as executable:
+                executable.write(f'#!/usr/bin/env python\nimport {module}\n{module}.main()\n')
+            os.chmod(path, 0o755)
+            record.append(f'../../../bin/{script},,')
+        with open(os.path.join(dist_info, 'RECORD'), 'w') as record_file:
+            record_file.write('\n'.join(record) + '\n')
+    return root
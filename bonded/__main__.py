@@ -1,18 +1,25 @@
+import contextlib
 import fnmatch
 import logging
 import os
 import sys
 from pathlib import Path
 
-import rich.logging
-
-from .display import display_closing, display_report
-from .evaluation import evaluate_bonds
+from ._archive import _excluded, Image, ImageEnvironment
+from ._importlib import current_environment, Environment
+from ._index import find_sites, open_index, SiteIndex
+from ._pipeline import read_ahead, ScanPool
+from ._requirements import is_lock_file
+from ._results import FileResults, in_shard, read_changed_files
+from .evaluation import evaluate_bonds, executables_to_inspect
+from .events import Events, NO_EVENTS
 
 from .executable_inspection import ExecutableInspection
 from .module_inspection import ModuleInspection
 from .package_inspection import PackageInspection
-from .settings import Settings
+from .settings import gather_config, MergeSettings, Settings, WhereSettings
+from .timings import Timings
+from .writers import open_output, WRITERS
 
 
 log = logging.getLogger('bonded')
@@ -25,16 +32,22 @@ def setup_logging(level):
         level = 5
 
     lvl = [logging.CRITICAL, logging.ERROR, logging.WARN, logging.INFO, logging.DEBUG][level - 1]
+    # rich is only imported when something is displayed with it
+    import rich.logging
+
     log.addHandler(rich.logging.RichHandler(level=lvl))
     log.setLevel(lvl)
 
 
-def iter_source_files(starting_dir, excludes, file_pattern):
+def iter_source_files(starting_dir, excludes, file_pattern, events=NO_EVENTS):
     for root, dirs, files in os.walk(starting_dir):
         for f in fnmatch.filter(files, file_pattern):
             full = os.path.join(root, f)
             if not any(fnmatch.fnmatch(full, exclude) for exclude in excludes):
-                yield Path(full)
+                path = Path(full)
+                if events:
+                    events.file_discovered(path)
+                yield path
         end = len(dirs)
         for i, d in enumerate(reversed(dirs), 1):
             full = os.path.join(root, d)
@@ -45,34 +58,271 @@ def iter_source_files(starting_dir, excludes, file_pattern):
                 del dirs[end - i]
 
 
+def where(arguments):
+    """List the sites of each name from a site index, without reading any source"""
+    arguments = WhereSettings.parse_args(arguments)
+    index = arguments.index
+    if not index and os.path.isfile('pyproject.toml'):
+        index = gather_config('pyproject.toml').get('index')
+    if not index:
+        WhereSettings.error('no --index given and none configured in ./pyproject.toml')
+    try:
+        connection = open_index(index)
+    except FileNotFoundError as err:
+        WhereSettings.error(str(err))
+    found = False
+    with contextlib.closing(connection):
+        for name in arguments.names:
+            for site in find_sites(connection, name):
+                found = True
+                print(f'{os.path.relpath(site.path)}:{site.line_number}: {site.kind} {site.name}')
+    return 0 if found else 1
+
+
 def main():
-    settings = Settings.from_interactive()
+    if sys.argv[1:2] == ['where']:
+        return where(sys.argv[2:])
+    timings = Timings()
+    with timings.phase('settings'):
+        if sys.argv[1:2] == ['merge']:
+            settings = Settings.from_interactive(sys.argv[2:], MergeSettings)
+        else:
+            settings = Settings.from_interactive()
+    # a zip search_path is read from throughout the scan, then closed however the run ends
+    with settings.artifact or contextlib.nullcontext():
+        return run(settings, timings)
 
+
+def run(settings, timings):
+    """Scan, evaluate and report, as configured by `settings`"""
     setup_logging(settings.verbose)
     log.info('Using settings %s', settings)
+    timed = settings.timings or settings.timings_file or settings.memory_profile
+    if settings.memory_profile:
+        timings.start_memory_profile()
+    # scanners only do any per-file bookkeeping when something is observing them
+    events = Events([timings] if timed else [])
+    progress = None
+    if settings.progress:
+        from .progress import Progress
+
+        progress = Progress()
+        events.append(progress)
+
+    in_archive = True
+    if settings.image:
+        with timings.phase('image'):
+            image = Image(settings.image)
+            settings.project_modules.update(
+                image.project_modules(settings.search_path, settings.exclude)
+            )
+        all_files = image.iter_files(settings.search_path, settings.exclude, '*', events)
+        python_files = image.iter_files(settings.search_path, settings.exclude, '*.py', events)
+    elif settings.artifact is not None:
+        image = None
+        all_files = settings.artifact.iter_files(settings.exclude, '*', events)
+        python_files = settings.artifact.iter_files(settings.exclude, '*.py', events)
+    else:
+        image = None
+        in_archive = False
+        all_files = iter_source_files(settings.search_path, settings.exclude, '*', events)
+        python_files = iter_source_files(settings.search_path, settings.exclude, '*.py', events)
+
+    current_environment.workers = settings.workers
+    environments = [Environment(path, settings.workers) for path in sorted(settings.environment)]
+    if image:
+        environments.insert(0, ImageEnvironment(image, settings.workers))
+    if timed:
+        # otherwise environments are read on first use, which is part of whichever phase
+        with timings.phase('environments'):
+            for environment in [current_environment, *environments]:
+                len(environment.modules)
+
+    with timings.phase('requirements'):
+        packages = PackageInspection(settings.packages)
+        if settings.pyproject:
+            packages.update_from_pyproject(settings.pyproject)
+        if settings.setup:
+            packages.update_from_setup(settings.setup)
+        for pip_requirements in settings.requirements:
+            if is_lock_file(pip_requirements):
+                packages.update_from_lock(pip_requirements)
+            else:
+                packages.update_from_pip_requirements(pip_requirements)
+
+    results = None
+    changed = None
+    if settings.partials:
+        # every file was scanned by one of the shards
+        results = FileResults.merge(sorted(settings.partials))
+        changed = set()
+        all_files = python_files = []
+        events.append(results)
+    elif settings.results_file:
+        if settings.changed_files:
+            results = FileResults.load(settings.results_file, settings.search_path)
+        if results is None:
+            results = FileResults(settings.search_path)
+        else:
+            changed = results.forget(read_changed_files(settings.changed_files))
+            all_files = [
+                results.path(key)
+                for key in sorted(changed)
+                if results.path(key).is_file()
+                and not _excluded(str(results.path(key)), settings.search_path, settings.exclude)
+            ]
+            python_files = [path for path in all_files if fnmatch.fnmatch(path.name, '*.py')]
+        events.append(results)
+    index = None
+    if settings.index:
+        index = SiteIndex(settings.index, settings.search_path)
+        events.append(index)
+    # bonded's own files name every executable, which must not count as running them
+    own_files = {
+        os.path.abspath(own_file)
+        for own_file in (
+            settings.results_file,
+            settings.index,
+            settings.index and f'{settings.index}-journal',
+            settings.output,
+            settings.timings_file,
+        )
+        if own_file
+    }
+    if own_files:
+        all_files = (path for path in all_files if os.path.abspath(path) not in own_files)
+    if timed and not in_archive:
+        # otherwise search_path is walked as it is scanned, as archives always are
+        with timings.phase('discovery'):
+            all_files = list(all_files)
+            python_files = list(python_files)
+    if settings.shard:
+        # every shard walks all of search_path, so the merge can put files back in walk order
+        results.order = {}
+        shard_files = []
+        for order, path in enumerate(all_files):
+            key = results.key(path)
+            if in_shard(key, settings.shard_number, settings.shard_count):
+                results.order[key] = order
+                shard_files.append(path)
+        all_files = shard_files
+        python_files = [path for path in shard_files if fnmatch.fnmatch(path.name, '*.py')]
+
+    # files are scanned in worker processes fed by threads reading ahead, or read as scanned
+    depth = max(settings.read_ahead, 2 * settings.scan_processes)
+    pool = None
+    if settings.scan_processes:
+        # unless read ahead, workers read each file themselves, largest first, from its size on disk
+        largest_first = not (settings.read_ahead or in_archive)
+        pool = ScanPool(settings.scan_processes, depth, largest_first)
+
+    def read(project_files):
+        if not depth or (pool and pool.largest_first):
+            return project_files
+        return read_ahead(project_files, depth)
+
+    with timings.phase('imports'), progress or contextlib.nullcontext():
+        if progress and not in_archive:
+            # listing the tree first gives an ETA, archives are not held in memory to do so
+            python_files = progress.discover(python_files)
+            progress.start('imports', len(python_files))
+        modules = ModuleInspection(settings.retention, events, settings.file_policy)
+        if changed is not None:
+            results.replay_imports(modules)
+        modules.inspect_imports(read(python_files), pool)
+    if pool is not None:
+        timings.add_cpu('imports', pool.take_cpu_seconds())
+
+    packages_by_environment = [
+        packages.in_environment(environment) for environment in environments
+    ] or [packages]
 
-    all_files = iter_source_files(settings.search_path, settings.exclude, '*')
-    python_files = iter_source_files(settings.search_path, settings.exclude, '*.py')
+    with timings.phase('executables'), progress or contextlib.nullcontext():
+        if progress and not in_archive:
+            all_files = progress.discover(all_files)
+            progress.start('executables', len(all_files))
+        # executables are searched for once, for every environment together
+        executables = ExecutableInspection(
+            {
+                executable
+                for environment_packages in packages_by_environment
+                for executable in executables_to_inspect(settings, modules, environment_packages)
+            },
+            settings.retention,
+            events,
+        )
+        if changed is not None:
+            results.replay_executables(executables)
+        # every file has to be searched for every executable for what is kept to be complete
+        exhaustive = results is not None or index is not None
+        executables.inspect_executables(read(all_files), exhaustive=exhaustive, pool=pool)
+        if changed is not None and not results.executables.issuperset(executables):
+            # unchanged files were never searched for these, so all of them have to be
+            unsearched = set(executables) - results.executables
+            unchanged_files = (
+                path
+                for path in iter_source_files(settings.search_path, settings.exclude, '*')
+                if results.key(path) not in changed and os.path.abspath(path) not in own_files
+            )
+            if index is not None:
+                index.searching = unsearched
+            executables.inspect_executables(read(unchanged_files), unsearched, exhaustive, pool)
+    if pool is not None:
+        timings.add_cpu('executables', pool.take_cpu_seconds())
+        pool.shutdown()
 
-    packages = PackageInspection(settings.packages)
-    if settings.pyproject:
-        packages.update_from_pyproject(settings.pyproject)
-    if settings.setup:
-        packages.update_from_setup(settings.setup)
-    for pip_requirements in settings.requirements:
-        packages.update_from_pip_requirements(pip_requirements)
+    if settings.results_file:
+        # changed files were only searched for the executables searched for this time
+        results.executables = set(executables)
+        results.save(settings.results_file)
+    if index is not None:
+        if changed is None:
+            index.prune()
+        else:
+            # deleted, or now excluded, so never scanned to replace what was found in them
+            index.remove(key for key in changed if key not in index.scanned)
+        index.close()
+    if settings.shard:
+        # the shards are only evaluated together, by bonded merge
+        if timed:
+            from .display import display_timings
 
-    modules = ModuleInspection()
-    modules.inspect_imports(python_files)
+            display_timings(settings, timings)
+        return 0
 
-    executables = ExecutableInspection((e for p in packages.values() for e in p.executables))
-    executables.inspect_executables(all_files)
+    if settings.report in WRITERS:
+        # machine readable reports are streamed while evaluating, without rich
+        output = open_output(settings.output)
+    else:
+        from .display import display_closing, display_report
 
-    report = evaluate_bonds(settings, modules, packages, executables)
+        output = contextlib.nullcontext()
+    reports = []
+    with output as stream:
+        writer = WRITERS[settings.report](stream) if stream else None
+        for environment_packages in packages_by_environment:
+            for target in sorted(settings.targets) or [None]:
+                report = evaluate_bonds(
+                    settings, modules, environment_packages, executables, target, events
+                )
+                if writer:
+                    with timings.phase('evaluation'):
+                        writer.write(report)
+                else:
+                    with timings.phase('evaluation'):
+                        report.result()
+                    with timings.phase('report'):
+                        display_report(settings, report)
+                reports.append(report)
+        if writer:
+            writer.close()
+    if not writer:
+        display_closing(settings, *reports)
+    if timed:
+        from .display import display_timings
 
-    display_report(settings, report)
-    display_closing(settings, report)
-    return 0 if report.passes() else 1
+        display_timings(settings, timings)
+    return 0 if all(report.passes() for report in reports) else 1
 
 
 if __name__ == '__main__':
@@ -0,0 +1,346 @@
+import fnmatch
+import io
+import json
+import os
+import posixpath
+import re
+import tarfile
+import zipfile
+from pathlib import PurePosixPath
+
+from ._importlib import Environment, metadata, scripts_directory_candidates
+from .events import NO_EVENTS
+
+
+ZIP_SUFFIXES = ('.whl', '.pyz', '.egg', '.zip')
+
+_METADATA_FILES = {
+    'METADATA',
+    'PKG-INFO',
+    'RECORD',
+    'entry_points.txt',
+    'top_level.txt',
+    'installed-files.txt',
+    'SOURCES.txt',
+}
+_dist_info = re.compile(
+    r'^(?P<site>(?:.*/)?(?:site|dist)-packages)/(?P<info>[^/]+\.(?:dist|egg)-info)/(?P<file>[^/]+)$'
+)
+
+# layer entries named .wh.<name> delete <name> from lower layers, an opaque whiteout hides
+# the whole of the lower layers' directory
+_WHITEOUT = '.wh.'
+_OPAQUE_WHITEOUT = '.wh..wh..opq'
+
+
+def _normalize(name):
+    """Archive member names as relative posix paths, without any leading ./ or /"""
+    return posixpath.normpath('/' + name).lstrip('/')
+
+
+def _excluded(full_path, root, excludes):
+    """Whether `full_path`, or any directory between it and `root`, is excluded"""
+    if any(fnmatch.fnmatch(full_path, exclude) for exclude in excludes):
+        return True
+    directory = posixpath.dirname(full_path)
+    while len(directory) > len(root):
+        if any(
+            fnmatch.fnmatch(directory, exclude) or fnmatch.fnmatch(directory + '/', exclude)
+            for exclude in excludes
+        ):
+            return True
+        directory = posixpath.dirname(directory)
+    return False
+
+
+def _project_modules(files, root, excludes):
+    """Like Settings._locate_project_modules, for the set of file paths in an archive"""
+    if root in files:
+        stem, ext = posixpath.splitext(posixpath.basename(root))
+        return {stem} if ext == '.py' else set()
+    if posixpath.join(root, '__init__.py') in files:
+        return {posixpath.basename(root)}
+    prefix = f'{root}/' if root else ''
+    modules = set()
+    for path in files:
+        if not path.startswith(prefix) or not path.endswith('.py'):
+            continue
+        if _excluded(f'/{path}', f'/{root}', excludes):
+            continue
+        parts = path.replace(prefix, '', 1).split('/')
+        for depth in range(1, len(parts)):
+            package = prefix + '/'.join(parts[:depth])
+            if f'{package}/__init__.py' in files:
+                modules.add(parts[depth - 1])
+                break
+        else:
+            modules.add(posixpath.splitext(parts[-1])[0])
+    return modules
+
+
+class ArchiveFile:
+    """A file read out of an archive, offering the parts of Path that the scanners use
+
+    Only one member's contents are held at a time
+    """
+
+    def __init__(self, path, data):
+        self.path = path
+        self._data = data
+        self.name = PurePosixPath(path).name
+        self.suffix = PurePosixPath(path).suffix
+
+    def __str__(self):
+        return self.path
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.path!r})'
+
+    def is_file(self):
+        return True
+
+    @property
+    def size(self):
+        return len(self._data)
+
+    def read_bytes(self):
+        return self._data
+
+    def open(self, mode='rb'):
+        if mode != 'rb':
+            raise ValueError(f'{self.path} can only be opened in binary read mode')
+        return io.BytesIO(self._data)
+
+
+class ZipMember(ArchiveFile):
+    """A file in a zip archive, only read when a scanner asks for its contents"""
+
+    def __init__(self, path, archive, info):
+        super().__init__(path, None)
+        self._archive = archive
+        self._info = info
+
+    @property
+    def size(self):
+        return self._info.file_size
+
+    def read_bytes(self):
+        return self._archive.read(self._info)
+
+    def open(self, mode='rb'):
+        if mode != 'rb':
+            raise ValueError(f'{self.path} can only be opened in binary read mode')
+        return self._archive.open(self._info)
+
+
+class ZipArtifact:
+    """A wheel, zipapp, egg or zip file scanned in place through its central directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self._archive = zipfile.ZipFile(path)
+        self.files = {info.filename for info in self._archive.infolist() if not info.is_dir()}
+
+    def iter_files(self, excludes, file_pattern, events=NO_EVENTS):
+        """Like iter_source_files, for the members of the archive"""
+        root = self.path.replace(os.path.sep, '/')
+        for info in self._archive.infolist():
+            if info.is_dir() or not fnmatch.fnmatch(
+                posixpath.basename(info.filename), file_pattern
+            ):
+                continue
+            full_path = f'{root}/{_normalize(info.filename)}'
+            if _excluded(full_path, root, excludes):
+                continue
+            member = ZipMember(full_path, self._archive, info)
+            if events:
+                events.file_discovered(member)
+            yield member
+
+    def project_modules(self, excludes):
+        """Like Settings._locate_project_modules, for the members of the archive"""
+        return _project_modules(self.files, '', excludes)
+
+    def close(self):
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def is_zip_artifact(path):
+    return str(path).lower().endswith(ZIP_SUFFIXES) and os.path.isfile(path)
+
+
+def _oci_blob(layout, descriptor):
+    algorithm, _, encoded = descriptor['digest'].partition(':')
+    return os.path.join(layout, 'blobs', algorithm, encoded)
+
+
+def _oci_layers(layout):
+    """The layer blobs, lowest first, of the first image in an OCI layout directory"""
+    with open(os.path.join(layout, 'index.json')) as index_file:
+        manifest = json.load(index_file)
+    while 'manifests' in manifest:
+        # an index, possibly of several platforms' images
+        with open(_oci_blob(layout, manifest['manifests'][0])) as manifest_file:
+            manifest = json.load(manifest_file)
+    return [_oci_blob(layout, layer) for layer in manifest['layers']]
+
+
+class Image:
+    """A container image read directly from layer tarballs, which are never extracted
+
+    `path` is either a single, optionally compressed, tar of a root filesystem or an OCI
+    layout directory. Layers are always read as streams; one pass over all of them resolves
+    which files whiteouts leave visible, then each scan streams them again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.layers = _oci_layers(path) if os.path.isdir(path) else [path]
+        self.files, self.metadata_files = self._index_layers()
+
+    def _open_layer(self, layer):
+        try:
+            return tarfile.open(layer, mode='r|*')
+        except tarfile.ReadError as err:
+            raise ValueError(f'Cannot read image layer {layer}: {err}') from err
+
+    @staticmethod
+    def _hidden(path, layer, whiteouts, opaque):
+        if whiteouts.get(path, -1) > layer:
+            return True
+        while '/' in path:
+            path = path.rpartition('/')[0]
+            if whiteouts.get(path, -1) > layer or opaque.get(path, -1) > layer:
+                return True
+        return False
+
+    def _index_layers(self):
+        files = {}
+        whiteouts = {}
+        opaque = {}
+        metadata_files = {}
+        for layer_number, layer in enumerate(self.layers):
+            with self._open_layer(layer) as tar:
+                for member in tar:
+                    path = _normalize(member.name)
+                    directory, _, name = path.rpartition('/')
+                    if name == _OPAQUE_WHITEOUT:
+                        opaque[directory] = layer_number
+                    elif name.startswith(_WHITEOUT):
+                        removed = posixpath.join(directory, name.replace(_WHITEOUT, '', 1))
+                        whiteouts[removed] = layer_number
+                    elif member.isfile():
+                        files[path] = (layer_number, member.mode)
+                        match = _dist_info.match(path)
+                        if match and match['file'] in _METADATA_FILES:
+                            data = tar.extractfile(member).read()
+                            metadata_files[path, layer_number] = data.decode('utf-8', 'replace')
+                    elif not member.isdir():
+                        # links and devices replace whatever was below, but can't be scanned
+                        files.pop(path, None)
+        files = {
+            path: (layer_number, mode)
+            for path, (layer_number, mode) in files.items()
+            if not self._hidden(path, layer_number, whiteouts, opaque)
+        }
+        metadata_files = {
+            path: text
+            for (path, layer_number), text in metadata_files.items()
+            if files.get(path, (None,))[0] == layer_number
+        }
+        return files, metadata_files
+
+    def iter_files(self, starting_dir, excludes, file_pattern, events=NO_EVENTS):
+        """Like iter_source_files, for the files visible in the image under `starting_dir`"""
+        root = _normalize(starting_dir)
+        prefix = f'{root}/' if root else ''
+        for layer_number, layer in enumerate(self.layers):
+            with self._open_layer(layer) as tar:
+                for member in tar:
+                    path = _normalize(member.name)
+                    if self.files.get(path, (None,))[0] != layer_number:
+                        continue
+                    if not (path == root or path.startswith(prefix)):
+                        continue
+                    if not fnmatch.fnmatch(posixpath.basename(path), file_pattern):
+                        continue
+                    if _excluded(f'/{path}', f'/{root}', excludes):
+                        continue
+                    project_file = ArchiveFile(f'/{path}', tar.extractfile(member).read())
+                    if events:
+                        events.file_discovered(project_file)
+                    yield project_file
+
+    def project_modules(self, starting_dir, excludes):
+        """Like Settings._locate_project_modules, for the files visible in the image"""
+        return _project_modules(self.files, _normalize(starting_dir), excludes)
+
+
+class _ImagePath:
+    """Enough of a path for importlib_metadata to locate installed files inside an image"""
+
+    def __init__(self, image, path):
+        self._image = image
+        self.path = posixpath.normpath(path)
+
+    def __str__(self):
+        return self.path
+
+    def __fspath__(self):
+        return self.path
+
+    def exists(self):
+        return self.path in self._image.files
+
+
+class _ImageDistribution(metadata.Distribution):
+    """A distribution whose metadata was read out of an image"""
+
+    def __init__(self, image, site, files):
+        self._image = image
+        self._site = site
+        self._files = files
+
+    def read_text(self, filename):
+        return self._files.get(filename)
+
+    def locate_file(self, path):
+        return _ImagePath(self._image, posixpath.join(self._site, str(path)))
+
+
+class ImageEnvironment(Environment):
+    """The distributions installed inside a container image"""
+
+    def __init__(self, image, workers=None):
+        super().__init__(workers=workers)
+        self.path = image.path
+        self.image = image
+        self.site_directories = sorted(
+            {_dist_info.match(path)['site'] for path in image.metadata_files}
+        )
+
+    def _find_distributions(self):
+        grouped = {}
+        for path, text in sorted(self.image.metadata_files.items()):
+            match = _dist_info.match(path)
+            grouped.setdefault((match['site'], match['info']), {})[match['file']] = text
+        return [_ImageDistribution(self.image, site, files) for (site, _), files in grouped.items()]
+
+    def _list_scripts(self):
+        directories = {
+            os.path.normpath(directory)
+            for site in self.site_directories
+            for directory in scripts_directory_candidates(site)
+        }
+        scripts = {}
+        for path, (_, mode) in self.image.files.items():
+            directory, _, name = path.rpartition('/')
+            if directory in directories and mode & 0o111:
+                scripts.setdefault(name, set()).add(directory)
+        return scripts
@@ -0,0 +1,92 @@
+from collections import deque
+
+from packaging import utils as pkgutil
+from packaging.markers import default_environment
+
+from ._requirements import parse_requirement
+
+
+class DependencyGraph:
+    """The installed distributions of an environment and the distributions each requires
+
+    Requirements are read from Requires-Dist metadata as they are reached, with markers
+    evaluated for `marker_environment` and any extras requested along the way. A node is a
+    distribution name together with the extras it was required with.
+    """
+
+    def __init__(self, environment, marker_environment=None):
+        self.environment = environment
+        self.marker_environment = {**default_environment(), **(marker_environment or {})}
+        self._edges = {}
+        self._closures = {}
+
+    def _marker_applies(self, marker, extras):
+        if marker is None:
+            return True
+        return any(
+            marker.evaluate({**self.marker_environment, 'extra': extra})
+            for extra in (sorted(extras) or [''])
+        )
+
+    def dependencies(self, name, extras=frozenset()):
+        """The (name, extras) nodes directly required by distribution `name`"""
+        node = (name, extras)
+        if node not in self._edges:
+            edges = []
+            for requirement in self.environment.requires(name):
+                parsed = parse_requirement(requirement)
+                if self._marker_applies(parsed.marker, extras):
+                    dependency = (pkgutil.canonicalize_name(parsed.name), frozenset(parsed.extras))
+                    if dependency not in edges:
+                        edges.append(dependency)
+            self._edges[node] = edges
+        return self._edges[node]
+
+    def closure(self, name, extras=frozenset()):
+        """Every distribution name `name` requires, directly or transitively"""
+        root = (name, extras)
+        if root in self._closures:
+            return self._closures[root]
+        reached = set()
+        # the root is only seen once reached again, by a cycle
+        seen = set()
+        pending = [root]
+        while pending:
+            for dependency in self.dependencies(*pending.pop()):
+                if dependency in seen:
+                    continue
+                seen.add(dependency)
+                reached.add(dependency[0])
+                if dependency in self._closures:
+                    # already complete, no need to walk it again
+                    reached.update(self._closures[dependency])
+                else:
+                    pending.append(dependency)
+        self._closures[root] = frozenset(reached)
+        return self._closures[root]
+
+    def shortest_path(self, roots, targets):
+        """The shortest chain of requirements from any of `roots` to any of `targets`
+
+        `roots` are (name, extras) nodes, tried in order so that ties are stable. Returns a
+        tuple of distribution names starting at a root, or None if no root requires a target.
+        """
+        targets = set(targets)
+        roots = [root for root in roots if targets & self.closure(*root)]
+        if not roots:
+            return None
+        parents = {root: None for root in roots}
+        pending = deque(roots)
+        while pending:
+            node = pending.popleft()
+            if node[0] in targets and parents[node] is not None:
+                path = []
+                while node is not None:
+                    path.append(node[0])
+                    node = parents[node]
+                return tuple(reversed(path))
+            for dependency in self.dependencies(*node):
+                if dependency not in parents:
+                    parents[dependency] = node
+                    pending.append(dependency)
+        return None
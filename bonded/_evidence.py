@@ -0,0 +1,87 @@
+import sys
+from array import array
+from collections import namedtuple
+
+
+Location = namedtuple('Location', ['file_name', 'file_type', 'line_number'])
+Retention = namedtuple('Retention', ['limit', 'counting'])
+
+RETENTION_CHOICES = ('found', 'count', 'all')
+
+
+def parse_retention(value):
+    """Convert an --evidence setting to a Retention
+
+    "found" only records that something was found, "count" also counts how often, "all" keeps
+    every location and a number N keeps the first N locations
+    """
+    value = str(value).strip().lower()
+    if value == 'found':
+        return Retention(0, False)
+    if value == 'count':
+        return Retention(0, True)
+    if value == 'all':
+        return Retention(None, True)
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise ValueError(
+            f'Evidence retention {value!r} must be one of {", ".join(RETENTION_CHOICES)}'
+            ' or a number of locations'
+        )
+    return Retention(limit, True)
+
+
+DEFAULT_RETENTION = parse_retention('10')
+FOUND_RETENTION = parse_retention('found')
+
+
+class Evidence:
+    """Where a record was found, keeping no more locations than its Retention allows
+
+    Locations are held as parallel arrays rather than a tuple per hit, and file names are
+    interned so that the many hits in one file share a single string
+    """
+
+    __slots__ = ('retention', 'count', '_file_names', '_file_types', '_line_numbers')
+
+    def __init__(self, retention=DEFAULT_RETENTION):
+        self.retention = retention
+        self.count = 0
+        # only allocated once a location is kept
+        self._file_names = self._file_types = self._line_numbers = ()
+
+    @property
+    def complete(self):
+        """Whether further locations would change nothing, so searching can stop"""
+        return not self.retention.counting and self.count > 0
+
+    def add(self, file_name, file_type, line_number):
+        if self.complete:
+            return
+        self.count += 1
+        limit = self.retention.limit
+        if limit is None or len(self._line_numbers) < limit:
+            if not self._line_numbers:
+                self._file_names = []
+                self._file_types = []
+                self._line_numbers = array('L')
+            self._file_names.append(sys.intern(str(file_name)))
+            self._file_types.append(file_type)
+            self._line_numbers.append(line_number)
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """The retained locations, in the order they were found"""
+        for location in zip(self._file_names, self._file_types, self._line_numbers):
+            yield Location(*location)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(count={self.count}, retained={len(self._line_numbers)})'
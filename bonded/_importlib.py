@@ -1,15 +1,333 @@
-from collections import defaultdict
+import csv
+import glob
+import inspect
+import os
+import stat
+import sysconfig
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from importlib import machinery  # noqa: F401
 
 import importlib_metadata as metadata
 from packaging import utils as pkgutil
 
-pkg2dist = metadata.packages_distributions()
-dist2pkg = defaultdict(list)
-for pkg, dists in pkg2dist.items():
-    #if pkg == '..' or pkg.endswith('.dist-info'):
-        #continue
-    for dist in dists:
-        dist = pkgutil.canonicalize_name(dist)
-        dist2pkg[dist].append(pkg)
-dist2pkg = dict(dist2pkg)
+
+def pool_map(function, iterable, workers=None):
+    """Apply `function` to every item using a bounded thread pool, keeping the input order
+
+    Reading metadata is many small, latency bound, file reads so threads overlap well. With no
+    `workers` the executor chooses how many threads from the CPU count
+    """
+    if workers == 1:
+        return list(map(function, iterable))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, iterable))
+
+
+class _LazyIndex(Mapping):
+    """A read-only mapping that is only built the first time it is used"""
+
+    def __init__(self, build):
+        self._build = build
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._build()
+        return self._index
+
+    def __getitem__(self, key):
+        return self.index[key]
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+def _top_level_names(dist):
+    """The importable top-level names a distribution provides, as packages_distributions finds"""
+    declared = (dist.read_text('top_level.txt') or '').split()
+    if declared:
+        return declared
+    inferred = set()
+    for file in dist.files or ():
+        top, *rest = file.parts
+        name = top if rest else (inspect.getmodulename(str(file)) or str(file))
+        if '.' not in name:
+            inferred.add(name)
+    return sorted(inferred)
+
+
+def _load_distribution(dist):
+    return pkgutil.canonicalize_name(dist.metadata['Name']), dist, _top_level_names(dist)
+
+
+class _TrieNode:
+    __slots__ = ('children', 'distributions')
+
+    def __init__(self):
+        self.children = {}
+        self.distributions = set()
+
+
+class ModuleTrie:
+    """Dotted module names, each node holding the distributions that install that module
+
+    Namespace packages are split between several distributions, so only the longest
+    prefix of an imported name that some distribution installs tells which one provides it
+    """
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def insert(self, dotted_name, distribution):
+        node = self.root
+        for part in dotted_name.split('.'):
+            node = node.children.setdefault(part, _TrieNode())
+        node.distributions.add(distribution)
+
+    def resolve(self, dotted_name):
+        """The distributions installing the longest known prefix of `dotted_name`"""
+        node = self.root
+        found = set()
+        for part in dotted_name.split('.'):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.distributions:
+                found = node.distributions
+        return found
+
+
+def _record_module_names(dist):
+    """The dotted names of every package and module listed in a distribution's RECORD"""
+    record = dist.read_text('RECORD')
+    if not record:
+        return set()
+    names = set()
+    for line in record.splitlines():
+        if line.startswith('"'):
+            path = next(csv.reader([line]))[0]
+        else:
+            path = line.split(',', 1)[0]
+        *packages, file_name = path.split('/')
+        if not all(package.isidentifier() for package in packages):
+            # metadata, scripts, data and __pycache__ directories
+            continue
+        for depth in range(1, len(packages) + 1):
+            names.add('.'.join(packages[:depth]))
+        module = inspect.getmodulename(file_name)
+        if module and module.split('.')[0].isidentifier() and module != '__init__':
+            names.add('.'.join([*packages, module.split('.')[0]]))
+    return names
+
+
+def _scripts_directories():
+    schemes = [sysconfig.get_default_scheme() if hasattr(sysconfig, 'get_default_scheme') else None]
+    try:
+        schemes.append(sysconfig.get_preferred_scheme('user'))
+    except AttributeError:
+        # before 3.10
+        schemes.append(f'{os.name}_user')
+    directories = []
+    for scheme in schemes:
+        try:
+            directory = os.path.normpath(
+                sysconfig.get_path('scripts', scheme) if scheme else sysconfig.get_path('scripts')
+            )
+        except KeyError:
+            continue
+        if directory not in directories:
+            directories.append(directory)
+    return directories
+
+
+def _executables_in(directory):
+    try:
+        with os.scandir(directory) as entries:
+            return {
+                entry.name
+                for entry in entries
+                if entry.is_file()
+                and entry.stat().st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+            }
+    except OSError:
+        return set()
+
+
+def _scripts_installed_by(dist, scripts):
+    record = dist.read_text('RECORD')
+    if not record:
+        return set()
+    base = None
+    installed = set()
+    for line in record.splitlines():
+        if line.startswith('"'):
+            path = next(csv.reader([line]))[0]
+        else:
+            path = line.split(',', 1)[0]
+        head, _, executable = path.rpartition('/')
+        if executable not in scripts or not head:
+            continue
+        if base is None:
+            base = str(dist.locate_file(''))
+        if os.path.normpath(os.path.join(base, head)) in scripts[executable]:
+            installed.add(executable)
+    return installed
+
+
+def _site_directories(path):
+    """Find the directories distributions are installed into under a venv or root filesystem"""
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        raise ValueError(f'Environment {path} is not a directory')
+    patterns = [
+        os.path.join('lib*', 'python*', 'site-packages'),
+        os.path.join('Lib', 'site-packages'),
+        os.path.join('usr', 'lib*', 'python*', '*-packages'),
+        os.path.join('usr', 'local', 'lib*', 'python*', '*-packages'),
+    ]
+    directories = []
+    for pattern in patterns:
+        for directory in sorted(glob.glob(os.path.join(path, pattern))):
+            if os.path.realpath(directory) not in map(os.path.realpath, directories):
+                directories.append(directory)
+    # otherwise this is already a site-packages
+    return directories or [path]
+
+
+def scripts_directory_candidates(site_directory):
+    """Where scripts are installed for a site-packages, i.e. <prefix>/bin for <prefix>/lib/..."""
+    parts = os.path.normpath(site_directory).split(os.path.sep)
+    for i in range(len(parts) - 1, 0, -1):
+        if parts[i] in ('lib', 'lib64', 'Lib'):
+            prefix = os.path.sep.join(parts[:i]) or os.path.sep
+            return [os.path.join(prefix, 'bin'), os.path.join(prefix, 'Scripts')]
+    return []
+
+
+class Environment:
+    """The distributions installed in one python environment
+
+    With no path this is the running interpreter's environment. Otherwise the path is a venv,
+    a site-packages directory or a root filesystem, whose metadata is read directly without
+    running its interpreter. Everything is indexed once, on first use.
+    """
+
+    def __init__(self, path=None, workers=None):
+        self.path = path
+        # threads used to read distribution metadata
+        self.workers = workers
+        self.site_directories = _site_directories(path) if path is not None else None
+        self._distribution_index = None
+        # canonical distribution name -> Distribution
+        self.distributions = _LazyIndex(lambda: self._load_distribution_index()[0])
+        # canonical distribution name -> top-level modules provided
+        self.modules = _LazyIndex(lambda: self._load_distribution_index()[1])
+        # executable -> the scripts directories it is in, listed on first use
+        self._scripts = None
+        # canonical distribution name -> executables it put in a scripts directory
+        self._executable_files = {}
+        self._module_trie = None
+        self._requires = {}
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.path!r})'
+
+    def _find_distributions(self):
+        if self.site_directories is None:
+            return metadata.distributions()
+        return metadata.distributions(path=self.site_directories)
+
+    def _list_scripts(self):
+        """Map each executable in this environment's scripts directories to its directories"""
+        if self.site_directories is None:
+            directories = _scripts_directories()
+        else:
+            directories = [
+                directory
+                for site in self.site_directories
+                for directory in scripts_directory_candidates(site)
+                if os.path.isdir(directory)
+            ]
+        scripts = {}
+        for directory in directories:
+            for executable in _executables_in(directory):
+                scripts.setdefault(executable, set()).add(os.path.normpath(directory))
+        return scripts
+
+    def _load_distribution_index(self):
+        if self._distribution_index is None:
+            distributions = {}
+            modules = {}
+            for name, dist, top_level in pool_map(
+                _load_distribution, self._find_distributions(), self.workers
+            ):
+                # like metadata.distribution(), the first found on the path wins
+                if name not in distributions:
+                    distributions[name] = dist
+                    modules[name] = top_level
+            self._distribution_index = distributions, modules
+        return self._distribution_index
+
+    def requires(self, name):
+        """The Requires-Dist strings of an installed distribution, read once"""
+        if name not in self._requires:
+            dist = self.distributions.get(name)
+            self._requires[name] = (dist.requires or []) if dist is not None else []
+        return self._requires[name]
+
+    @property
+    def module_trie(self):
+        """A ModuleTrie of what each distribution installs, built on first use
+
+        Only top-level names installed by more than one distribution, i.e. namespace packages,
+        need their distributions' full RECORDs read to tell them apart
+        """
+        if self._module_trie is None:
+            trie = ModuleTrie()
+            owners = {}
+            for name, top_level in self.modules.items():
+                for module in top_level:
+                    trie.insert(module, name)
+                    owners.setdefault(module, []).append(name)
+            shared = {name for names in owners.values() if len(names) > 1 for name in names}
+            ordered = sorted(shared)
+            for name, dotted_names in zip(
+                ordered,
+                pool_map(
+                    lambda name: _record_module_names(self.distributions[name]),
+                    ordered,
+                    self.workers,
+                ),
+            ):
+                for dotted_name in dotted_names:
+                    if len(owners.get(dotted_name.split('.')[0], ())) > 1:
+                        trie.insert(dotted_name, name)
+            self._module_trie = trie
+        return self._module_trie
+
+    def executable_files(self, name):
+        """The executables the distribution `name` put in a scripts directory
+
+        The scripts directories are listed once, then a distribution's RECORD is only read when
+        its executables are first asked for, and only scanned for lines naming one of those files
+        """
+        if name not in self._executable_files:
+            if self._scripts is None:
+                self._scripts = self._list_scripts()
+            dist = self.distributions.get(name)
+            self._executable_files[name] = (
+                _scripts_installed_by(dist, self._scripts)
+                if dist is not None and self._scripts
+                else set()
+            )
+        return self._executable_files[name]
+
+
+current_environment = Environment()
+distributions = current_environment.distributions
+dist2pkg = current_environment.modules
@@ -0,0 +1,157 @@
+import logging
+import os
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+
+from ._results import relative_key
+from .events import Observer
+
+
+log = logging.getLogger(__name__)
+
+
+# bumped whenever the schema changes, an index of any other version is rebuilt
+INDEX_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+CREATE TABLE sites (
+    name TEXT NOT NULL,
+    file INTEGER NOT NULL REFERENCES files (id),
+    line INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    scanner TEXT NOT NULL
+);
+CREATE INDEX sites_by_name ON sites (name);
+CREATE INDEX sites_by_file ON sites (file, scanner);
+"""
+
+Site = namedtuple('Site', ['path', 'line_number', 'kind', 'name'])
+
+
+class SiteIndex(Observer):
+    """Every import and execution site found, kept in a SQLite database between runs
+
+    Each file's sites are replaced as the file is scanned, so a run over only some files, such
+    as with --changed-files, updates the index in place
+    """
+
+    def __init__(self, database, search_path):
+        self.root = os.path.abspath(search_path)
+        self.connection = sqlite3.connect(database)
+        self._prepare()
+        # sites found in a file are only written once the file has been scanned
+        self._pending = {}
+        self._file_ids = {}
+        self.scanned = set()
+        # the executables files are being searched for, when not every one of them
+        self.searching = None
+
+    def _prepare(self):
+        (version,) = self.connection.execute('PRAGMA user_version').fetchone()
+        if version != INDEX_VERSION:
+            if version:
+                log.info('Rebuilding site index of version %s', version)
+            for table in ('sites', 'files', 'meta'):
+                self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+        root = self.connection.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        if root and root[0] != self.root:
+            log.info('Site index was of %s, rebuilding it for %s', root[0], self.root)
+            self.connection.execute('DELETE FROM sites')
+            self.connection.execute('DELETE FROM files')
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('root', ?)", (self.root,)
+        )
+
+    def _file_id(self, key):
+        if key not in self._file_ids:
+            self.connection.execute('INSERT OR IGNORE INTO files (path) VALUES (?)', (key,))
+            (self._file_ids[key],) = self.connection.execute(
+                'SELECT id FROM files WHERE path = ?', (key,)
+            ).fetchone()
+        return self._file_ids[key]
+
+    def _add(self, scanner, project_file, name, line_number, kind):
+        key = relative_key(self.root, project_file)
+        self._pending.setdefault((scanner, key), []).append((name, line_number, kind))
+
+    def import_found(self, dotted_name, project_file, line_number, dynamic):
+        kind = 'dynamic import' if dynamic else 'import'
+        self._add('imports', project_file, dotted_name, line_number, kind)
+
+    def name_imported(self, dotted_name, project_file, line_number):
+        self._add('imports', project_file, dotted_name, line_number, 'from import')
+
+    def executable_found(self, executable, project_file, line_number, file_type):
+        self._add('executables', project_file, executable, line_number, 'executable')
+
+    def file_scanned(self, scanner, project_file, seconds, size):
+        key = relative_key(self.root, project_file)
+        file_id = self._file_id(key)
+        if scanner == 'executables' and self.searching is not None:
+            self.connection.executemany(
+                'DELETE FROM sites WHERE file = ? AND scanner = ? AND name = ?',
+                ((file_id, scanner, name) for name in self.searching),
+            )
+        else:
+            self.connection.execute(
+                'DELETE FROM sites WHERE file = ? AND scanner = ?', (file_id, scanner)
+            )
+        self.connection.executemany(
+            'INSERT INTO sites (name, file, line, kind, scanner) VALUES (?, ?, ?, ?, ?)',
+            (
+                (name, file_id, line_number, kind, scanner)
+                for name, line_number, kind in self._pending.pop((scanner, key), ())
+            ),
+        )
+        self.scanned.add(key)
+
+    def remove(self, keys):
+        """Drop every site in the files `keys`"""
+        for key in keys:
+            row = self.connection.execute('SELECT id FROM files WHERE path = ?', (key,)).fetchone()
+            if row:
+                self.connection.execute('DELETE FROM sites WHERE file = ?', row)
+                self.connection.execute('DELETE FROM files WHERE id = ?', row)
+
+    def prune(self):
+        """Drop every file not scanned by this run, after it has scanned all of search_path"""
+        self.remove(
+            [
+                path
+                for (path,) in self.connection.execute('SELECT path FROM files').fetchall()
+                if path not in self.scanned
+            ]
+        )
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def open_index(database):
+    """Open an existing site index read only"""
+    if not os.path.isfile(database):
+        raise FileNotFoundError(f'No site index at {database}, create one with --index')
+    return sqlite3.connect(f'{Path(database).resolve().as_uri()}?mode=ro', uri=True)
+
+
+def find_sites(connection, name):
+    """Every site of `name`, or of any submodule of `name`
+
+    Submodules are found as the range of names from "name." up to "name/", the character
+    following ".", so that both halves of the query use the index on name
+    """
+    (root,) = connection.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+    rows = connection.execute(
+        'SELECT files.path, sites.line, sites.kind, sites.name FROM sites'
+        ' JOIN files ON files.id = sites.file'
+        ' WHERE sites.name = ? OR (sites.name >= ? AND sites.name < ?)'
+        ' ORDER BY files.path, sites.line',
+        (name, f'{name}.', f'{name}/'),
+    )
+    return [Site(os.path.join(root, path), line, kind, found) for path, line, kind, found in rows]
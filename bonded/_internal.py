@@ -1,5 +1,9 @@
 _record_cache = {}
 
+# shared by every record that has nothing to hold, so that empty records allocate nothing
+EMPTY_SET = frozenset()
+EMPTY_TUPLE = ()
+
 
 class _Record:
     """Base class to represent a project resource being tracked
@@ -7,17 +11,23 @@ class _Record:
     records are unique per name but may contain mutable search information
     """
 
+    __slots__ = ('_normalized_name',)
+
     @staticmethod
     def _normalize_name(name):
         return name
 
+    @classmethod
+    def _record_key(cls, name, *args, **kwargs):
+        return (cls, cls._normalize_name(name))
+
     def __new__(cls, *args, **kwargs):
-        name = cls._normalize_name(kwargs.get('name', args[0]))
-        if (cls, name) in _record_cache:
-            record = _record_cache[(cls, name)]
+        key = cls._record_key(*args, **kwargs)
+        if key in _record_cache:
+            record = _record_cache[key]
         else:
             record = super().__new__(cls)
-            _record_cache[(cls, name)] = record
+            _record_cache[key] = record
         return record
 
     def __init__(self, name):
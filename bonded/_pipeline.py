@@ -0,0 +1,127 @@
+import collections
+import functools
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from ._archive import ArchiveFile
+from .timings import file_size
+
+
+class ReadFile(ArchiveFile):
+    """A file read ahead of being scanned, standing in for the path it was read from"""
+
+    def __fspath__(self):
+        return self.path
+
+
+def bounded_map(executor, function, items, depth):
+    """Yield each item and `function` of it, in order, submitting at most `depth` items ahead
+
+    Unlike Executor.map, `items` is consumed lazily, so no more than `depth` items and results
+    are ever held at once
+    """
+    pending = collections.deque()
+    try:
+        for item in items:
+            pending.append((item, executor.submit(function, item)))
+            if len(pending) >= depth:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def _read(project_file):
+    if not project_file.is_file():
+        return project_file
+    return ReadFile(str(project_file), project_file.read_bytes())
+
+
+def read_ahead(project_files, depth):
+    """Yield `project_files` with their contents already read, by threads reading `depth` ahead
+
+    Scanning then never waits on opening and reading files, only on files it outpaces the
+    threads to. Memory is bounded by the `depth` files read but not yet scanned.
+    """
+    with ThreadPoolExecutor(max_workers=depth) as pool:
+        for _, read_file in bounded_map(pool, _read, project_files, depth):
+            yield read_file
+
+
+def _size(project_file):
+    try:
+        return file_size(project_file)
+    except OSError:
+        return 0
+
+
+def largest_first_map(executor, function, items, depth):
+    """Like bounded_map, but submitting the largest files first
+
+    Every file is listed and sized up front, then results are held until all those of files
+    before them have arrived, so they are still yielded in the order of `items`. One large file
+    then starts early and runs alongside the many small ones, instead of being left to finish
+    last.
+    """
+    items = list(items)
+    schedule = iter(sorted(range(len(items)), key=lambda i: _size(items[i]), reverse=True))
+    pending = {}
+    done = {}
+
+    def submit():
+        position = next(schedule, None)
+        if position is not None:
+            pending[executor.submit(function, items[position])] = position
+
+    try:
+        for _ in range(depth):
+            submit()
+        for position, item in enumerate(items):
+            while position not in done:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done[pending.pop(future)] = future.result()
+                    submit()
+            yield item, done.pop(position)
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _cpu_timed(function, item):
+    start = time.process_time()
+    result = function(item)
+    return result, time.process_time() - start
+
+
+class ScanPool(ProcessPoolExecutor):
+    """Worker processes that the scanners hand files to, no more than `depth` files ahead
+
+    With `largest_first` the workers read files themselves, and the largest are handed out first.
+    The CPU time the workers spent on every file is added up in `cpu_seconds`.
+    """
+
+    def __init__(self, processes, depth, largest_first=False):
+        super().__init__(max_workers=processes)
+        self.depth = depth
+        self.largest_first = largest_first
+        self.cpu_seconds = 0.0
+
+    def map_ahead(self, function, items):
+        timed = functools.partial(_cpu_timed, function)
+        if self.largest_first:
+            mapped = largest_first_map(self, timed, items, self.depth)
+        else:
+            mapped = bounded_map(self, timed, items, self.depth)
+        for item, (result, cpu_seconds) in mapped:
+            self.cpu_seconds += cpu_seconds
+            yield item, result
+
+    def take_cpu_seconds(self):
+        """The CPU time the workers spent since this was last called"""
+        cpu_seconds, self.cpu_seconds = self.cpu_seconds, 0.0
+        return cpu_seconds
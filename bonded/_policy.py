@@ -0,0 +1,47 @@
+from collections import namedtuple
+
+from .timings import file_size
+
+
+SCAN = 'scan'
+HEADER = 'header'
+SKIP = 'skip'
+# from least to most of a file left unscanned
+POLICIES = (SCAN, HEADER, SKIP)
+
+# only the start of a file is read to decide if it was generated
+SNIFF_BYTES = 1024
+GENERATED_MARKERS = (
+    b'@generated',
+    b'do not edit',
+    b'autogenerated',
+    b'auto-generated',
+    b'code generated by',
+    b'generated by the protocol buffer compiler',
+)
+
+
+def is_generated(project_file):
+    """Whether the first bytes of a file declare it to be generated"""
+    with project_file.open('rb') as stream:
+        head = stream.read(SNIFF_BYTES).lower()
+    return any(marker in head for marker in GENERATED_MARKERS)
+
+
+class FilePolicy(namedtuple('FilePolicy', ['large_file_size', 'large_files', 'generated_files'])):
+    """How much of each file is tokenized for imports
+
+    Files larger than `large_file_size` bytes are treated as `large_files` says and generated
+    files as `generated_files` says: "scan" all of it, only its "header" or "skip" it. A file
+    that is both is treated as whichever leaves more unscanned.
+    """
+
+    __slots__ = ()
+
+    def __call__(self, project_file):
+        scan = SCAN
+        if self.large_files != SCAN and file_size(project_file) > self.large_file_size:
+            scan = self.large_files
+        if scan != SKIP and self.generated_files != SCAN and is_generated(project_file):
+            scan = max(scan, self.generated_files, key=POLICIES.index)
+        return scan
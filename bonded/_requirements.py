@@ -0,0 +1,190 @@
+import logging
+import re
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+import tomli
+
+from packaging import requirements as pkgreq
+
+
+log = logging.getLogger(__name__)
+
+
+LOCK_FILE_NAMES = ('uv.lock', 'poetry.lock', 'pdm.lock')
+
+# per-requirement options, such as --hash, follow the requirement itself
+_trailing_options = re.compile(r'\s+--?[A-Za-z]')
+# comments must start a line or be preceded by whitespace
+_comment = re.compile(r'(^|\s+)#.*$')
+
+RequirementLine = namedtuple('RequirementLine', ['kind', 'value', 'line_number'])
+ParsedRequirements = namedtuple('ParsedRequirements', ['requirements', 'includes'])
+
+
+@lru_cache(maxsize=None)
+def parse_requirement(requirement):
+    """Parse a requirement string, sharing the result with every identical string"""
+    return pkgreq.Requirement(requirement)
+
+
+def is_lock_file(file_name):
+    return str(file_name).replace('\\', '/').rsplit('/', 1)[-1] in LOCK_FILE_NAMES
+
+
+def _logical_lines(stream):
+    """Join lines ending in a backslash and strip comments, yielding one line at a time"""
+    buffer = []
+    start = None
+    for line_number, line in enumerate(stream, start=1):
+        if start is None:
+            start = line_number
+        line = line.rstrip('\r\n')
+        if line.endswith('\\'):
+            buffer.append(line[:-1])
+            continue
+        buffer.append(line)
+        yield start, _comment.sub('', ''.join(buffer)).strip()
+        buffer = []
+        start = None
+    if buffer:
+        yield start, _comment.sub('', ''.join(buffer)).strip()
+
+
+def _option_value(line, short, long):
+    """Return the argument of the option `short` or `long` if it begins `line`"""
+    for option in (long, short):
+        if line.startswith(option):
+            value = line.replace(option, '', 1)
+            if value[:1] in ('=', ' ', '\t'):
+                return value.lstrip('= \t')
+            if option == short and value:
+                return value
+    return None
+
+
+def iter_pip_requirements(stream):
+    """Stream the contents of a pip requirements file
+
+    Yields a RequirementLine for every requirement, nested requirements file (-r) and
+    constraints file (-c). All other options, including per-requirement options such as
+    --hash, are dropped.
+    """
+    for line_number, line in _logical_lines(stream):
+        if not line:
+            continue
+        if line.startswith('-'):
+            for kind, short, long in (
+                ('requirements', '-r', '--requirement'),
+                ('constraints', '-c', '--constraint'),
+            ):
+                value = _option_value(line, short, long)
+                if value is None and long == '--requirement':
+                    # not a pip spelling, but accepted historically
+                    value = _option_value(line, short, '--requirements')
+                if value:
+                    yield RequirementLine(kind, value.split()[0], line_number)
+                    break
+            continue
+        option = _trailing_options.search(line)
+        if option:
+            line = line[: option.start()]
+        yield RequirementLine('requirement', line, line_number)
+
+
+class IncludeGraph:
+    """Pip requirements files and the other requirements files they include with -r
+
+    Each file is parsed only once, no matter how many times it is included
+    """
+
+    def __init__(self):
+        self.files = {}
+
+    def parse(self, requirements_file):
+        """Return the requirements and includes of a single, already resolved, file"""
+        if requirements_file not in self.files:
+            requirements = []
+            includes = []
+            with requirements_file.open('r') as stream:
+                for kind, value, line_number in iter_pip_requirements(stream):
+                    if kind == 'requirements':
+                        includes.append((requirements_file.parent / value).resolve())
+                    elif kind == 'constraints':
+                        # constraints only limit versions, they do not declare a dependency
+                        log.info(
+                            'Skipping constraints file %s in %s:%s',
+                            value,
+                            requirements_file.name,
+                            line_number,
+                        )
+                    else:
+                        requirements.append((value, line_number))
+            self.files[requirements_file] = ParsedRequirements(requirements, includes)
+        return self.files[requirements_file]
+
+    def walk(self, requirements_file):
+        """Yield `requirements_file` and every file it includes, each only once
+
+        Includes that lead back to a file still being walked are reported and not followed
+        """
+        root = Path(requirements_file).resolve()
+        yield root, self.parse(root)
+        visited = {root}
+        stack = [root]
+        pending = [iter(self.parse(root).includes)]
+        while pending:
+            included = next(pending[-1], None)
+            if included is None:
+                pending.pop()
+                stack.pop()
+                continue
+            if included in stack:
+                log.warning(
+                    'Requirements file %s is included by %s, forming a cycle', included, stack[-1]
+                )
+                continue
+            if included in visited:
+                continue
+            visited.add(included)
+            yield included, self.parse(included)
+            stack.append(included)
+            pending.append(iter(self.parse(included).includes))
+
+
+def _iter_toml_array_tables(stream, table):
+    """Yield each [[table]] of a TOML document, parsing only one entry at a time
+
+    Lock files are long lists of [[package]] entries; parsing each entry separately means the
+    whole document is never held in memory.
+    """
+    header = f'[[{table}]]'
+    subtables = (f'[{table}.', f'[[{table}.')
+    chunk = None
+    for line in stream:
+        if line.startswith('['):
+            stripped = line.strip()
+            if stripped == header or not stripped.startswith(subtables):
+                if chunk:
+                    yield tomli.loads(''.join(chunk))[table][0]
+                chunk = [line] if stripped == header else None
+                continue
+        if chunk is not None:
+            chunk.append(line)
+    if chunk:
+        yield tomli.loads(''.join(chunk))[table][0]
+
+
+def iter_lock_requirements(stream):
+    """Stream a requirement string for every package pinned in a uv, poetry or pdm lock file"""
+    for package in _iter_toml_array_tables(stream, 'package'):
+        source = package.get('source', {})
+        if isinstance(source, dict) and ('editable' in source or 'virtual' in source):
+            # the locked project itself
+            continue
+        requirement = package['name']
+        marker = package.get('marker', package.get('markers'))
+        if marker and isinstance(marker, str):
+            requirement = f'{requirement}; {marker}'
+        yield requirement
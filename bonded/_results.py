@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sys
+import zlib
+from pathlib import Path
+
+from .events import Observer
+from .writers import open_output
+
+
+log = logging.getLogger(__name__)
+
+
+# bumped whenever the layout of a results file changes, older files are then ignored
+RESULTS_VERSION = 1
+
+
+def read_changed_files(changed_files, stdin=None):
+    """The paths given to --changed-files, "-" standing for the paths on stdin, one per line"""
+    paths = []
+    for changed_file in changed_files:
+        if changed_file == '-':
+            paths.extend(line.strip() for line in (stdin or sys.stdin) if line.strip())
+        else:
+            paths.append(changed_file)
+    return paths
+
+
+def relative_key(root, project_file):
+    """How a file under the absolute path `root` is known between runs"""
+    return os.path.relpath(os.path.abspath(project_file), root)
+
+
+class FileResults(Observer):
+    """What the scanners found in each file under search_path, kept between runs
+
+    Files are keyed by their path relative to search_path. Every file has been searched for each
+    of `executables`, so a later run only has to search unchanged files for any others.
+    """
+
+    def __init__(self, search_path, files=None, executables=()):
+        self.search_path = search_path
+        self.root = os.path.abspath(search_path)
+        self.files = {} if files is None else files
+        self.executables = set(executables)
+        # when sharding, each file's place in the walk of all of search_path
+        self.order = None
+
+    def key(self, project_file):
+        return relative_key(self.root, project_file)
+
+    def _entry(self, project_file):
+        key = self.key(project_file)
+        if key not in self.files:
+            self.files[key] = {} if self.order is None else {'order': self.order[key]}
+        return self.files[key]
+
+    def import_found(self, dotted_name, project_file, line_number, dynamic):
+        self._entry(project_file).setdefault('imports', []).append(
+            [dotted_name, line_number, dynamic]
+        )
+
+    def name_imported(self, dotted_name, project_file, line_number):
+        self._entry(project_file).setdefault('names', []).append(dotted_name)
+
+    def executable_found(self, executable, project_file, line_number, file_type):
+        self._entry(project_file).setdefault('executables', []).append(
+            [executable, line_number, file_type]
+        )
+
+    def forget(self, changed_files):
+        """Drop the results of `changed_files`, returning the keys of those under search_path"""
+        keys = set()
+        for changed_file in changed_files:
+            key = self.key(changed_file)
+            if key == os.path.pardir or key.startswith(os.path.pardir + os.path.sep):
+                log.info('Ignoring changed file %s outside of %s', changed_file, self.search_path)
+                continue
+            self.files.pop(key, None)
+            keys.add(key)
+        return keys
+
+    def path(self, key):
+        return Path(os.path.join(self.search_path, key))
+
+    def replay_imports(self, modules):
+        """Add the imports of every file still held to a ModuleInspection"""
+        for key, found in self.files.items():
+            path = self.path(key)
+            for dotted_name, line_number, dynamic in found.get('imports', ()):
+                modules.add_import(dotted_name, path, line_number, dynamic)
+            for dotted_name in found.get('names', ()):
+                modules[dotted_name.split('.')[0]].add_imported_name(dotted_name)
+
+    def replay_executables(self, executables):
+        """Add what every file still held was found to execute to an ExecutableInspection"""
+        for key, found in self.files.items():
+            file_name = os.path.basename(key)
+            for executable, line_number, file_type in found.get('executables', ()):
+                if executable in executables:
+                    executables[executable].found_executions.add(file_name, file_type, line_number)
+
+    def as_dict(self):
+        return {
+            'version': RESULTS_VERSION,
+            'root': self.root,
+            'search_path': self.search_path,
+            'executables': sorted(self.executables),
+            'files': self.files,
+        }
+
+    def save(self, results_file):
+        # written alongside then moved into place, so an interrupted run leaves the old results
+        with open_output(results_file) as output:
+            json.dump(self.as_dict(), output, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, results_file, search_path):
+        """Results saved by an earlier run over `search_path`, or None if there are none to use"""
+        try:
+            saved = _read(results_file)
+        except FileNotFoundError:
+            log.info('No results in %s, scanning all of %s', results_file, search_path)
+            return None
+        except ValueError as err:
+            log.warning('%s, scanning all of %s', err, search_path)
+            return None
+        results = cls(search_path, saved['files'], saved['executables'])
+        if saved['root'] != results.root:
+            log.warning(
+                'Results in %s are of %s, scanning all of %s',
+                results_file,
+                saved['root'],
+                search_path,
+            )
+            return None
+        return results
+
+    @classmethod
+    def merge(cls, partials):
+        """The results of every shard of one search_path together, in the order it was walked
+
+        Every file is known to have been searched for only those executables all shards were
+        """
+        merged = None
+        for partial in partials:
+            saved = _read(partial)
+            if merged is None:
+                merged = cls(saved['search_path'], {}, saved['executables'])
+            elif (saved['root'], saved['search_path']) != (merged.root, merged.search_path):
+                raise ValueError(f'Partial results in {partial} are of another search_path')
+            merged.executables.intersection_update(saved['executables'])
+            overlap = merged.files.keys() & saved['files'].keys()
+            if overlap:
+                raise ValueError(f'Partial results in {partial} repeat {sorted(overlap)[0]}')
+            merged.files.update(saved['files'])
+        merged.files = dict(
+            sorted(merged.files.items(), key=lambda item: item[1].get('order', sys.maxsize))
+        )
+        return merged
+
+
+def _read(results_file):
+    with open(results_file) as stream:
+        try:
+            saved = json.load(stream)
+        except ValueError as err:
+            raise ValueError(f'Cannot read results in {results_file}: {err}') from err
+    if not isinstance(saved, dict) or saved.get('version') != RESULTS_VERSION:
+        raise ValueError(f'Results in {results_file} are from another version of bonded')
+    return saved
+
+
+def partials_search_path(partials):
+    """The search_path scanned by the shards whose partial results are `partials`"""
+    return _read(partials[0])['search_path']
+
+
+def in_shard(key, number, count):
+    """Whether the file `key` is scanned by the `number`-th of `count` shards
+
+    Decided by the file's path alone, so every shard agrees without listing files in the same
+    order, or at all
+    """
+    return zlib.crc32(key.replace(os.path.sep, '/').encode('utf-8')) % count == number - 1
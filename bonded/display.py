@@ -1,3 +1,4 @@
+import json
 import sys
 
 from rich import print
@@ -9,36 +10,97 @@ from ._sys import stdlib_module_names
 from .evaluation import Confidence
 
 
-def display_closing(settings, evaluation):
-    if not settings.quiet and evaluation.passes():
+def display_closing(settings, *evaluations):
+    if not settings.quiet and all(evaluation.passes() for evaluation in evaluations):
         print('All Good!', file=sys.stderr)
 
 
+def display_timings(settings, timings):
+    """Show timings on stderr, so they never mix with the report, and write any JSON dump"""
+    if settings.timings_file:
+        with open(settings.timings_file, 'w') as timings_file:
+            json.dump(timings.as_dict(), timings_file, indent=2)
+    if settings.memory_profile:
+        display_memory_profile(timings)
+    if not settings.timings:
+        return
+    phases = Table(title='Timings')
+    phases.add_column('Phase')
+    phases.add_column('Wall (s)', justify='right')
+    phases.add_column('CPU (s)', justify='right')
+    for name, (wall, cpu) in timings.phases.items():
+        phases.add_row(name, f'{wall:.3f}', f'{cpu:.3f}')
+    print(phases, file=sys.stderr)
+    for scanner in timings.scanners.values():
+        scanned = Table(
+            title=(
+                f'{scanner.name}: {scanner.files} files, {scanner.bytes} bytes'
+                f' in {scanner.seconds:.3f}s'
+                + (
+                    f' ({scanner.files / scanner.seconds:.0f} files/s,'
+                    f' {scanner.bytes / scanner.seconds:.0f} bytes/s)'
+                    if scanner.seconds
+                    else ''
+                )
+            )
+        )
+        scanned.add_column('Slowest Files')
+        scanned.add_column('Seconds', justify='right')
+        for name, seconds in scanner.slowest:
+            scanned.add_row(name, f'{seconds:.4f}')
+        print(scanned, file=sys.stderr)
+
+
+def display_memory_profile(timings):
+    memory = Table(title='Memory')
+    memory.add_column('Phase')
+    memory.add_column('Peak (KiB)', justify='right')
+    memory.add_column('Retained (KiB)', justify='right')
+    for name, phase in timings.memory.items():
+        memory.add_row(name, f'{phase.peak / 1024:.1f}', f'{phase.retained / 1024:.1f}')
+    print(memory, file=sys.stderr)
+    sites = Table(title='Top Allocations')
+    sites.add_column('Phase')
+    sites.add_column('Allocated At', overflow='fold')
+    sites.add_column('Retained (KiB)', justify='right')
+    sites.add_column('Blocks', justify='right')
+    for name, phase in timings.memory.items():
+        for site, size, count in phase.top:
+            sites.add_row(name, site, f'{size / 1024:.1f}', str(count))
+    print(sites, file=sys.stderr)
+
+
 def display_report(settings, evaluation):
     format_lookup = {
-        'none': (lambda _, __: None),
         'line': format_line_output,
         'table': format_table_output,
         'extended-table': format_extended_table_output,
     }
-    print(format_lookup[settings.report](settings, evaluation))
+    if settings.report == 'none':
+        return
+    result = evaluation.result()
+    if result.environment is not None:
+        print(f'Environment: {result.environment}')
+    if result.target:
+        print(f'Target: {result.target}')
+    print(format_lookup[settings.report](settings, result))
 
 
-def format_line_output(settings, evaluation):
+def format_line_output(settings, result):
     report = ''
-    excess_packages = evaluation.package_report()
+    excess_packages = result.unused_packages
     if excess_packages:
-        report += f"Packages: {', '.join(excess_packages)}\n"
-    excess_modules = evaluation.module_report()
+        report += f"Packages: {', '.join(ep.package_name for ep in excess_packages)}\n"
+    excess_modules = result.modules_without_package
     if excess_modules:
-        report += f"Modules: {', '.join(excess_modules)}"
+        report += f"Modules: {', '.join(em.name for em in excess_modules)}"
     return report
 
 
-def format_table_output(settings, evaluation):
+def format_table_output(settings, result):
     report = Columns()
 
-    excess_packages = evaluation.package_report()
+    excess_packages = result.unused_packages
     if excess_packages:
         excess_packages_report = Table()
         excess_packages_report.add_column('Unused Package')
@@ -47,40 +109,43 @@ def format_table_output(settings, evaluation):
             excess_packages_report.add_row(ep.package_name, ', '.join(m for m in ep.modules))
         report.add_renderable(excess_packages_report)
 
-    excess_modules = evaluation.module_report()
+    excess_modules = result.modules_without_package
     if excess_modules:
         excess_modules_report = Table()
         excess_modules_report.add_column('Modules Used Without a Package')
+        excess_modules_report.add_column('Installed Through')
         for em in excess_modules:
-            excess_modules_report.add_row(em.name)
+            path = em.installed_through
+            excess_modules_report.add_row(em.name, ' -> '.join(path) if path else '')
         report.add_renderable(excess_modules_report)
 
     return report
 
 
-def format_extended_table_output(settings, evaluation):
+def format_extended_table_output(settings, result):
     report = Table()
     report.add_column('Package')
     report.add_column('Used')
     report.add_column('Module')
     report.add_column('Used')
-    all_modules = set(evaluation.modules)
+    all_modules = {name for name, module in result.modules.items() if module.imports is not None}
 
-    for package in evaluation.packages.values():
+    def module_used(mod):
+        return str(result.modules[mod].confidence)
+
+    for package in result.packages.values():
         mods = list(package.modules)
         if not mods:
-            report.add_row(
-                package.package_name, str(evaluation.evaluate_package(package.name)), '---', '---'
-            )
+            report.add_row(package.package_name, str(package.confidence), '---', '---')
         else:
             mods.sort()
             mod = mods.pop(0)
             all_modules.discard(mod)
             report.add_row(
                 package.package_name,
-                str(evaluation.evaluate_package(package.name)),
+                str(package.confidence),
                 mod,
-                str(evaluation.evaluate_module(mod)),
+                module_used(mod),
             )
         for mod in mods:
             all_modules.discard(mod)
@@ -88,7 +153,7 @@ def format_extended_table_output(settings, evaluation):
                 '---',
                 '---',
                 mod,
-                str(evaluation.evaluate_module(mod)),
+                module_used(mod),
             )
 
     this_project_modules = [mod for mod in all_modules if mod in settings.project_modules]
@@ -96,23 +161,21 @@ def format_extended_table_output(settings, evaluation):
         this_project_modules.sort()
         mod = this_project_modules.pop(0)
         all_modules.discard(mod)
-        report.add_row(
-            settings.search_path, str(Confidence.SKIPPED), mod, str(evaluation.evaluate_module(mod))
-        )
+        report.add_row(settings.search_path, str(Confidence.SKIPPED), mod, module_used(mod))
         for mod in this_project_modules:
             all_modules.discard(mod)
-            report.add_row('---', '---', mod, str(evaluation.evaluate_module(mod)))
+            report.add_row('---', '---', mod, module_used(mod))
 
     stdlib_modules = [mod for mod in all_modules if mod in stdlib_module_names]
     if stdlib_modules:
         stdlib_modules.sort()
         mod = stdlib_modules.pop(0)
         all_modules.discard(mod)
-        report.add_row('python', str(Confidence.SKIPPED), mod, str(evaluation.evaluate_module(mod)))
+        report.add_row('python', str(Confidence.SKIPPED), mod, module_used(mod))
         for mod in stdlib_modules:
             all_modules.discard(mod)
-            report.add_row('---', '---', mod, str(evaluation.evaluate_module(mod)))
+            report.add_row('---', '---', mod, module_used(mod))
 
     for mod in all_modules:
-        report.add_row('???', '???', mod, str(evaluation.evaluate_module(mod)))
+        report.add_row('???', '???', mod, module_used(mod))
     return report
@@ -1,9 +1,15 @@
+from collections import namedtuple
 from enum import IntEnum
-from functools import cache
+from functools import cache, lru_cache
+from types import MappingProxyType
 
 import tomli
+from packaging.markers import default_environment
 
+from ._dependencies import DependencyGraph
 from ._sys import stdlib_module_names
+from .events import NO_EVENTS
+from .module_inspection import Found
 
 
 class Confidence(IntEnum):
@@ -16,6 +22,82 @@ class Confidence(IntEnum):
     SKIPPED = 30
 
 
+class PackageResult(
+    namedtuple(
+        'PackageResult',
+        ['name', 'package_name', 'confidence', 'evidence', 'installed', 'modules', 'required_by'],
+    )
+):
+    __slots__ = ()
+
+    @property
+    def unused(self):
+        return not self.confidence
+
+
+class ModuleResult(
+    namedtuple(
+        'ModuleResult',
+        ['name', 'confidence', 'imported_names', 'imports', 'locations', 'installed_through'],
+    )
+):
+    __slots__ = ()
+
+    @property
+    def without_package(self):
+        # modules only provided by a required package were never imported, so need none
+        return not self.confidence and self.imports is not None
+
+
+class EvaluationResult(
+    namedtuple('EvaluationResult', ['packages', 'modules', 'environment', 'target'])
+):
+    """Everything an Evaluation decided, computed once and shared by every report
+
+    `packages` and `modules` are read-only mappings of name to PackageResult and ModuleResult.
+    Modules are every module imported and every module of a required package.
+    """
+
+    __slots__ = ()
+
+    @property
+    def unused_packages(self):
+        return [result for result in self.packages.values() if result.unused]
+
+    @property
+    def modules_without_package(self):
+        return [result for result in self.modules.values() if result.without_package]
+
+    def passes(self):
+        return not (self.unused_packages or self.modules_without_package)
+
+
+def parse_target(target):
+    """Convert a target such as "python_version=3.9,sys_platform=linux" to a marker environment
+
+    Any marker variable not mentioned keeps the value of the running interpreter
+    """
+    known_variables = default_environment()
+    environment = {}
+    for assignment in target.split(','):
+        variable, sep, value = assignment.partition('=')
+        variable = variable.strip()
+        if not sep or variable not in known_variables:
+            raise ValueError(f'Target {target!r} must be comma separated marker_variable=value')
+        environment[variable] = value.strip()
+    if 'python_version' in environment and 'python_full_version' not in environment:
+        environment['python_full_version'] = f"{environment['python_version']}.0"
+    elif 'python_full_version' in environment and 'python_version' not in environment:
+        environment['python_version'] = '.'.join(environment['python_full_version'].split('.')[:2])
+    return environment
+
+
+@lru_cache(maxsize=None)
+def _evaluate_marker(marker, environment):
+    # environment is a sorted tuple of items so that results can be shared between evaluations
+    return marker.evaluate(dict(environment) if environment else None)
+
+
 class Evaluation:
     def __init__(
         self,
@@ -24,20 +106,50 @@ class Evaluation:
         executables,
         settings,
         stdlib_modules=None,
+        target=None,
+        events=NO_EVENTS,
     ):
         self.packages = packages
         self.modules = modules
         self.executables = executables
         self.settings = settings
         self.stdlib_modules = stdlib_modules or stdlib_module_names
+        self.target = target
+        self.events = events
+        self.environment = parse_target(target) if target else {}
+        self._environment_key = tuple(sorted(self.environment.items()))
+        self._providers = {}
+        self._dependency_graph = None
+        # results kept as they are yielded, so result() never evaluates anything twice
+        self._package_results = {}
+        self._module_results = {}
 
     def _package_platform_ignored(self, package):
-        return package.markers and not any(mark.evaluate() for mark in package.markers)
+        return package.markers and not any(
+            _evaluate_marker(mark, self._environment_key) for mark in package.markers
+        )
+
+    def _module_providers(self, module):
+        """Distributions installing the modules imported under this top-level name"""
+        if module.name not in self._providers:
+            trie = self.packages.environment.module_trie
+            providers = set()
+            for dotted_name in module.imported_names or (module.name,):
+                providers.update(trie.resolve(dotted_name))
+            self._providers[module.name] = providers
+        return self._providers[module.name]
 
     def _package_module_used(self, package):
-        if not package.modules:
-            return Confidence.NONE
-        return max(self.evaluate_module(pkg_mod) for pkg_mod in package.modules)
+        used = Confidence.NONE
+        for pkg_mod in package.modules:
+            module_used = self.evaluate_module(pkg_mod)
+            if module_used != Confidence.SKIPPED and pkg_mod in self.modules:
+                providers = self._module_providers(self.modules[pkg_mod])
+                if providers and package.name not in providers:
+                    # another distribution sharing this namespace provides what was imported
+                    continue
+            used = max(used, module_used)
+        return used
 
     def _package_extention_used(self, package):
         extension_used = Confidence.NONE
@@ -70,22 +182,46 @@ class Evaluation:
         return Confidence.NONE
 
     @cache
-    def evaluate_package(self, package):
+    def package_evidence(self, package):
+        """The Confidence that `package` is used and the kind of evidence that gave it"""
         if package not in self.packages:
-            return Confidence.NONE
+            return Confidence.NONE, 'not required'
         pkg = self.packages[package]
-        if self._package_platform_ignored(pkg) or pkg.name in self.settings.ignore_packages:
-            return Confidence.SKIPPED
+        if self._package_platform_ignored(pkg):
+            return Confidence.SKIPPED, 'markers'
+        if pkg.name in self.settings.ignore_packages:
+            return Confidence.SKIPPED, 'ignored'
         if not pkg.installed:
-            return Confidence.NONE
-        return max(
-            self._package_module_used(pkg),
-            self._package_extention_used(pkg),
-            self._package_executable_used(pkg),
-            self._package_used_anyway(pkg),
-        )
+            return Confidence.NONE, 'not installed'
+        # check the cheapest evidence first, only loading further metadata when it could matter
+        used = self._package_module_used(pkg)
+        source = 'modules' if used else None
+        if used >= Confidence.VERY_HIGH:
+            return used, source
+        for kind, evidence in (
+            ('extensions', self._package_extention_used),
+            ('workaround', self._package_used_anyway),
+        ):
+            found = evidence(pkg)
+            if found > used:
+                used, source = found, kind
+        if used >= Confidence.MEDIUM:
+            # executables can't provide any more confidence than this
+            return used, source
+        found = self._package_executable_used(pkg)
+        if found > used:
+            used, source = found, 'executables'
+        return used, source
+
+    def evaluate_package(self, package):
+        return self.package_evidence(package)[0]
 
     def _module_belongs_to_package(self, module):
+        providers = self._module_providers(module)
+        if providers:
+            return any(provider in self.packages for provider in providers) or any(
+                module.name == pkg.name for pkg in self.packages.values()
+            )
         for pkg in self.packages.values():
             if module.name in pkg.modules:
                 return True
@@ -94,9 +230,9 @@ class Evaluation:
         return False
 
     def _module_imported(self, module):
-        if module.found_import_stmt:
+        if module.found & Found.IMPORT_STATEMENT:
             return Confidence.VERY_HIGH
-        if module.found_import_fun:
+        if module.found & Found.IMPORT_FUNCTION:
             return Confidence.HIGH
         return Confidence.NONE
 
@@ -129,22 +265,119 @@ class Evaluation:
             self._module_used_for_build(module),
         )
 
+    def _package_result(self, name, package):
+        confidence, evidence = self.package_evidence(name)
+        if self.events:
+            self.events.package_evaluated(name, confidence, evidence)
+        return PackageResult(
+            package.name,
+            package.package_name,
+            confidence,
+            evidence,
+            package.installed,
+            tuple(package.modules),
+            tuple(sorted(self.packages.provenance.get(package.name, ()))),
+        )
+
+    def _module_result(self, name):
+        confidence = self.evaluate_module(name)
+        if name not in self.modules:
+            # only provided by a required package, never imported
+            return ModuleResult(name, confidence, frozenset(), None, (), None)
+        module = self.modules[name]
+        return ModuleResult(
+            name,
+            confidence,
+            frozenset(module.imported_names),
+            len(module.found_imports),
+            tuple(module.found_imports),
+            None if confidence else self.dependency_path(name),
+        )
+
+    def iter_package_results(self):
+        """Yield the PackageResult of each package, as it is evaluated"""
+        for name, package in self.packages.items():
+            if name not in self._package_results:
+                self._package_results[name] = self._package_result(name, package)
+            yield self._package_results[name]
+
+    def iter_module_results(self):
+        """Yield the ModuleResult of every module imported then of every module of a package
+
+        Each is yielded as it is evaluated
+        """
+        names = dict.fromkeys(self.modules)
+        for package in self.packages.values():
+            names.update(dict.fromkeys(package.modules))
+        for name in names:
+            if name not in self._module_results:
+                self._module_results[name] = self._module_result(name)
+            yield self._module_results[name]
+
+    @cache
+    def result(self):
+        """Evaluate every package and module once, returning an EvaluationResult"""
+        packages = {result.name: result for result in self.iter_package_results()}
+        modules = {result.name: result for result in self.iter_module_results()}
+        return EvaluationResult(
+            MappingProxyType(packages),
+            MappingProxyType(modules),
+            self.packages.environment.path,
+            self.target,
+        )
+
     def package_report(self):
-        return {
-            package for name, package in self.packages.items() if not self.evaluate_package(name)
-        }
+        return {self.packages[result.name] for result in self.result().unused_packages}
 
     def module_report(self):
-        return {module for name, module in self.modules.items() if not self.evaluate_module(name)}
+        return {self.modules[result.name] for result in self.result().modules_without_package}
+
+    @property
+    def dependency_graph(self):
+        if self._dependency_graph is None:
+            self._dependency_graph = DependencyGraph(self.packages.environment, self.environment)
+        return self._dependency_graph
+
+    @cache
+    def dependency_path(self, module):
+        """The shortest chain of requirements, from a declared package, installing `module`
+
+        This is how a module used without a package of its own is only available by accident
+        """
+        if module not in self.modules:
+            return None
+        providers = self._module_providers(self.modules[module])
+        if not providers:
+            return None
+        roots = [
+            (package.name, frozenset(package.extras))
+            for _, package in sorted(self.packages.items())
+            if package.installed and not self._package_platform_ignored(package)
+        ]
+        return self.dependency_graph.shortest_path(roots, providers)
 
     def passes(self):
-        return not bool(self.package_report() or self.module_report())
+        return self.result().passes()
+
+
+def executables_to_inspect(settings, modules, packages):
+    """Yield the executables of every package that imports alone do not show to be used"""
+    evaluation = Evaluation(packages, modules, {}, settings)
+    for package in packages.values():
+        if (
+            package.installed
+            and package.name not in settings.ignore_packages
+            and evaluation._package_module_used(package) < Confidence.MEDIUM
+        ):
+            yield from package.executables
 
 
-def evaluate_bonds(settings, modules, packages, executables):
+def evaluate_bonds(settings, modules, packages, executables, target=None, events=NO_EVENTS):
     return Evaluation(
         packages,
         modules,
         executables,
         settings,
+        target=target,
+        events=events,
     )
@@ -0,0 +1,69 @@
+class Observer:
+    """Receives the events of a run, subclass it and override the events of interest
+
+    `scanner` is "imports" or "executables". `name_imported` is each name a from import
+    imports, which may or may not be a submodule
+    """
+
+    def file_discovered(self, project_file):
+        pass
+
+    def file_scanned(self, scanner, project_file, seconds, size):
+        pass
+
+    def import_found(self, dotted_name, project_file, line_number, dynamic):
+        pass
+
+    def name_imported(self, dotted_name, project_file, line_number):
+        pass
+
+    def executable_found(self, executable, project_file, line_number, file_type):
+        pass
+
+    def package_evaluated(self, package, confidence, source):
+        pass
+
+
+class Events(list):
+    """The Observers of a run, each told of every event in turn
+
+    An Events with no observers is false, and emitters check that before doing any work to
+    describe an event, so observing nothing costs a single truth test per event site
+    """
+
+    def file_discovered(self, project_file):
+        for observer in self:
+            observer.file_discovered(project_file)
+
+    def file_scanned(self, scanner, project_file, seconds, size):
+        for observer in self:
+            observer.file_scanned(scanner, project_file, seconds, size)
+
+    def import_found(self, dotted_name, project_file, line_number, dynamic):
+        for observer in self:
+            observer.import_found(dotted_name, project_file, line_number, dynamic)
+
+    def name_imported(self, dotted_name, project_file, line_number):
+        for observer in self:
+            observer.name_imported(dotted_name, project_file, line_number)
+
+    def executable_found(self, executable, project_file, line_number, file_type):
+        for observer in self:
+            observer.executable_found(executable, project_file, line_number, file_type)
+
+    def package_evaluated(self, package, confidence, source):
+        for observer in self:
+            observer.package_evaluated(package, confidence, source)
+
+
+class _NoEvents(Events):
+    """An Events no observer can be added to, so one shared default never observes any run"""
+
+    def _add(self, *args):
+        raise TypeError('NO_EVENTS cannot be observed, pass an Events of your own instead')
+
+    append = extend = insert = __setitem__ = __iadd__ = _add
+
+
+# the default for every emitter
+NO_EVENTS = _NoEvents()
@@ -1,8 +1,11 @@
+import functools
 import logging
 import re
-from collections import namedtuple
+import time
 
+from ._evidence import DEFAULT_RETENTION, Evidence
 from ._internal import _Record
+from .events import NO_EVENTS
 
 
 log = logging.getLogger(__name__)
@@ -38,43 +41,93 @@ def detect_file_type(file_path, first_line):
         return 'make'
 
 
-_CallingFile = namedtuple('_CallingFile', ['file_name', 'file_type', 'line_number'])
-
-
 class Executable(_Record):
     """Record tracking usage of an executable"""
 
-    def __init__(self, executable_name):
+    __slots__ = ('found_executions',)
+
+    def __init__(self, executable_name, retention=DEFAULT_RETENTION):
         super().__init__(executable_name)
-        self.found_executions = set()
+        self.found_executions = Evidence(retention)
 
 
 class ExecutableInspection(dict):
     """Inspect usage of executables"""
 
-    def __init__(self, keys):
-        instanciated_args = ((a, Executable(a)) for a in keys)
+    def __init__(self, keys, retention=DEFAULT_RETENTION, events=NO_EVENTS):
+        instanciated_args = ((a, Executable(a, retention)) for a in keys)
         super().__init__(instanciated_args)
+        self.events = events
 
-    def inspect_executables(self, project_files):
+    def inspect_executables(self, project_files, keys=None, exhaustive=False, pool=None):
+        """Search the given files for each executable, or only for those in `keys`
+
+        Unless `exhaustive`, an executable is no longer searched for once its evidence is complete.
+        Files are searched in `pool` if given.
+        """
+        events = self.events
         # TODO: python -m but only after finding __main__.py
         # re.compile(fr"\bpython[\d.]*\s+-m\s+{exe}\b")
-        exe_searches = {
-            exe.name: re.compile(rb'\b%b\b' % exe.name.encode('utf-8')) for exe in self.values()
-        }
-        for project_file in project_files:
-            if not project_file.is_file():
+        names = tuple(sorted(exe for exe in self if keys is None or exe in keys))
+        exe_searches = dict(_compile_searches(names))
+        if pool is not None:
+            # workers search for every executable, those no longer searched for are ignored here
+            searched = pool.map_ahead(functools.partial(_search_names, names), project_files)
+        else:
+            searched = (
+                (project_file, _search_file(exe_searches, project_file))
+                for project_file in project_files
+            )
+        for project_file, (file_type, found, size, seconds) in searched:
+            if size is None:
                 continue
-            pfile = project_file.read_bytes().splitlines()
-            if not pfile:
+            for exe, lineno in found:
+                if exe not in exe_searches:
+                    continue
+                self[exe].found_executions.add(project_file.name, file_type, lineno)
+                log.debug('Found executable %s in %s:%s', exe, project_file, lineno)
+                if events:
+                    events.executable_found(exe, project_file, lineno, file_type)
+            if events:
+                # also once a file is emptied, so whatever was found in it before is replaced
+                events.file_scanned('executables', project_file, seconds, size)
+            if exhaustive:
                 continue
-
-            file_type = detect_file_type(project_file, pfile[0])
-
-            for lineno, line in enumerate(pfile, start=1):
-                for exe, search in exe_searches.items():
-                    if search.search(line):
-                        self[exe].found_executions.add(
-                            _CallingFile(project_file.name, file_type, lineno)
-                        )
-                        log.debug('Found executable %s in %s:%s', exe, project_file, lineno)
+            # once an executable is known to be used there may be no need to look any further
+            for exe in [exe for exe in exe_searches if self[exe].found_executions.complete]:
+                del exe_searches[exe]
+            if not exe_searches:
+                break
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_searches(names):
+    """A search for each of the executable `names`, compiled once in each process"""
+    return {name: re.compile(rb'\b%b\b' % name.encode('utf-8')) for name in names}
+
+
+def _search_names(names, project_file):
+    """_search_file in a worker, which is only sent the names searched for, not their searches"""
+    return _search_file(_compile_searches(names), project_file)
+
+
+def _search_file(exe_searches, project_file):
+    """The type of a file and each executable found on each of its lines
+
+    A file that is missing has a size of None
+    """
+    if not project_file.is_file():
+        return None, (), None, 0.0
+    start = time.perf_counter()
+    contents = project_file.read_bytes()
+    lines = contents.splitlines()
+    if not lines:
+        return None, (), 0, 0.0
+    file_type = detect_file_type(project_file, lines[0])
+    found = [
+        (exe, lineno)
+        for lineno, line in enumerate(lines, start=1)
+        for exe, search in exe_searches.items()
+        if search.search(line)
+    ]
+    return file_type, found, len(contents), time.perf_counter() - start
@@ -1,8 +1,16 @@
+import functools
+import io
 import logging
+import time
 import tokenize
 import warnings
+from enum import IntFlag
 
-from ._internal import _Record
+from ._evidence import DEFAULT_RETENTION, Evidence, FOUND_RETENTION
+from ._internal import _Record, EMPTY_SET
+from ._policy import HEADER, SCAN, SKIP
+from .events import Events, NO_EVENTS, Observer
+from .timings import file_size
 
 
 log = logging.getLogger(__name__)
@@ -16,40 +24,164 @@ known_dynamic_loaders = [
 ]
 
 
+def _open_source(source_module):
+    """Open python source as text, like tokenize.open, from a path or a file in an archive"""
+    if hasattr(source_module, 'open'):
+        buffer = source_module.open('rb')
+    else:
+        buffer = open(source_module, 'rb')
+    try:
+        encoding, _ = tokenize.detect_encoding(buffer.readline)
+        buffer.seek(0)
+        return io.TextIOWrapper(buffer, encoding, line_buffering=True)
+    except BaseException:
+        buffer.close()
+        raise
+
+
+# tokens that only lay out source, and so never start a statement
+_LAYOUT_TOKENS = frozenset(
+    (tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING)
+)
+# statements that can be among the imports at the top of a module
+_HEADER_KEYWORDS = frozenset(('import', 'from', 'try', 'except', 'else', 'elif', 'if', 'finally'))
+
+
+def _in_header(token):
+    """Whether a top-level statement starting with `token` can be part of a module's header"""
+    if token.type == tokenize.NAME:
+        # dunders such as __all__ and __version__ are often set among the imports
+        return token.string in _HEADER_KEYWORDS or token.string.startswith('__')
+    return token.type in (tokenize.STRING, tokenize.NEWLINE, tokenize.ENDMARKER)
+
+
+class Found(IntFlag):
+    IMPORT_STATEMENT = 1
+    IMPORT_FUNCTION = 2
+
+
+_IMPORT_STATEMENT = int(Found.IMPORT_STATEMENT)
+_IMPORT_FUNCTION = int(Found.IMPORT_FUNCTION)
+
+
 class Module(_Record):
     """Record tracking modules seen in source code"""
 
-    def __init__(self, module_name):
+    __slots__ = ('found', 'imported_names', 'found_imports')
+
+    def __init__(self, module_name, retention=DEFAULT_RETENTION):
         super().__init__(module_name)
-        self.found_import_stmt = False
-        self.found_import_fun = False
+        # Found flags, kept as a plain int
+        self.found = 0
+        # the full dotted paths imported from this top-level module
+        self.imported_names = EMPTY_SET
+        self.found_imports = Evidence(retention)
+
+    @property
+    def found_import_stmt(self):
+        return bool(self.found & _IMPORT_STATEMENT)
+
+    @found_import_stmt.setter
+    def found_import_stmt(self, found):
+        self.found = self.found | _IMPORT_STATEMENT if found else self.found & ~_IMPORT_STATEMENT
+
+    @property
+    def found_import_fun(self):
+        return bool(self.found & _IMPORT_FUNCTION)
+
+    @found_import_fun.setter
+    def found_import_fun(self, found):
+        self.found = self.found | _IMPORT_FUNCTION if found else self.found & ~_IMPORT_FUNCTION
+
+    def add_imported_name(self, dotted_name):
+        if self.imported_names is EMPTY_SET:
+            self.imported_names = set()
+        self.imported_names.add(dotted_name)
 
 
 class ModuleInspection(dict):
     """Inspect usage of all top-level modules imported by a project"""
 
+    def __init__(self, retention=DEFAULT_RETENTION, events=NO_EVENTS, policy=None):
+        super().__init__()
+        self.retention = retention
+        self.events = events
+        # a FilePolicy deciding how much of each file is tokenized, all of every file if None
+        self.policy = policy
+
     def __missing__(self, key):
-        self[key] = Module(key)
+        self[key] = Module(key, self.retention)
         return self[key]
 
-    def inspect_imports(self, project_files):
-        """Collect all modules found in the given files"""
+    def inspect_imports(self, project_files, pool=None):
+        """Collect all modules found in the given files, tokenizing them in `pool` if given"""
+        if pool is not None:
+            scan = functools.partial(_scan_imports, self.policy)
+            return self._record_scanned(pool.map_ahead(scan, project_files))
+        events = self.events
         for pfile in project_files:
+            if events:
+                start = time.perf_counter()
+            scan = self.policy(pfile) if self.policy else SCAN
             try:
-                self.find_imports_from_token(pfile)
+                if scan != SKIP:
+                    self.find_imports_from_token(pfile, header_only=scan == HEADER)
             except tokenize.TokenError:
                 warnings.warn(f'Found {pfile} but cannot parse it.')
+            if events:
+                events.file_scanned('imports', pfile, time.perf_counter() - start, file_size(pfile))
+
+    def _record_scanned(self, scanned):
+        """Record what _scan_imports found, as scanning each file here would have"""
+        events = self.events
+        for pfile, (found, parsed, seconds) in scanned:
+            for dotted_name, line_number, dynamic in found:
+                if dynamic is None:
+                    self[dotted_name.split('.')[0]].add_imported_name(dotted_name)
+                    if events:
+                        events.name_imported(dotted_name, pfile, line_number)
+                    continue
+                self.add_import(dotted_name, pfile, line_number, dynamic)
+                if events:
+                    events.import_found(dotted_name, pfile, line_number, dynamic)
+            if not parsed:
+                warnings.warn(f'Found {pfile} but cannot parse it.')
+            if events:
+                events.file_scanned('imports', pfile, seconds, file_size(pfile))
+
+    def add_import(self, dotted_name, source_module, line_number, dynamic=False):
+        """Record that `dotted_name` is imported on `line_number` of `source_module`"""
+        module = self[dotted_name.split('.')[0]]
+        module.found |= _IMPORT_FUNCTION if dynamic else _IMPORT_STATEMENT
+        module.add_imported_name(dotted_name)
+        module.found_imports.add(source_module, 'python', line_number)
+
+    def find_imports_from_token(self, source_module, header_only=False):
+        """Return all top level modules that are imported by `source_module`
+
+        With `header_only`, tokenizing stops at the first top-level statement that cannot be part
+        of the module's header: its docstring, imports and the conditions guarding them
+        """
 
-    def find_imports_from_token(self, source_module):
-        """Return all top level modules that are imported by `source_module`"""
-        # TODO:tokens.line
         def add_package_from_statement(token):
+            """Record the dotted name starting at `token`, returning the token following it"""
             if token.exact_type in (tokenize.DOT, tokenize.ELLIPSIS):
                 # don't record relative imports
-                return
+                return token, None
             assert token.type == tokenize.NAME, 'illegal syntax'
-            self[token.string].found_import_stmt = True
-            log.debug('Module %s was found imported in %s', token.string, source_module)
+            dotted_name = token.string
+            line_number = token.start[0]
+            token = next(tokens)
+            while token.exact_type == tokenize.DOT:
+                token = next(tokens)
+                assert token.type == tokenize.NAME, 'illegal syntax'
+                dotted_name = f'{dotted_name}.{token.string}'
+                token = next(tokens)
+            self.add_import(dotted_name, source_module, line_number)
+            if self.events:
+                self.events.import_found(dotted_name, source_module, line_number, False)
+            log.debug('Module %s was found imported in %s', dotted_name, source_module)
+            return token, dotted_name
 
         def add_package_from_function(token):
             value = token.string
@@ -67,13 +199,25 @@ class ModuleInspection(dict):
             if value.startswith('.'):
                 # don't record relative imports
                 return
-            self[value].found_import_fun = True
-            log.debug('Module %s was found dynamically imported in %s', token.string, source_module)
+            self.add_import(value, source_module, token.start[0], dynamic=True)
+            if self.events:
+                self.events.import_found(value, source_module, token.start[0], True)
+            log.debug('Module %s was found dynamically imported in %s', value, source_module)
 
-        with tokenize.open(source_module) as stream:
+        with _open_source(source_module) as stream:
             try:
                 tokens = tokenize.generate_tokens(stream.readline)
+                statement_start = True
                 for token in tokens:
+                    if (
+                        header_only
+                        and statement_start
+                        and token.start[1] == 0
+                        and token.type not in _LAYOUT_TOKENS
+                        and not _in_header(token)
+                    ):
+                        log.debug('Stopped at the end of the header of %s', source_module)
+                        break
                     if token.type == tokenize.NAME and token.string in (
                         'raise',
                         'yield',
@@ -84,25 +228,35 @@ class ModuleInspection(dict):
                         ):
                             token = next(tokens)
                     if token.type == tokenize.NAME and token.string == 'import':
-                        token = next(tokens)
-                        add_package_from_statement(token)
+                        token, _ = add_package_from_statement(next(tokens))
                         while not (
                             token.type == tokenize.NEWLINE or token.exact_type == tokenize.SEMI
                         ):
-                            token = next(tokens)
                             if token.exact_type == tokenize.COMMA:
+                                token, _ = add_package_from_statement(next(tokens))
+                            else:
                                 token = next(tokens)
-                                add_package_from_statement(token)
                     if token.type == tokenize.NAME and token.string == 'from':
                         token = next(tokens)
                         if token.exact_type == tokenize.LPAR:
                             token = next(tokens)
-                        add_package_from_statement(token)
+                        token, from_name = add_package_from_statement(token)
+                        expect_name = False
                         while not (
                             token.type == tokenize.NEWLINE or token.exact_type == tokenize.SEMI
                         ):
                             # multiple top level packages cannot be imported under a single 'from'
-                            # but there may be an 'import' keyword that shouldn't go to the next if
+                            # but the names imported may be submodules of the package
+                            if token.type == tokenize.NAME and token.string == 'import':
+                                expect_name = True
+                            elif token.exact_type == tokenize.COMMA:
+                                expect_name = True
+                            elif expect_name and token.type == tokenize.NAME and from_name:
+                                name = f'{from_name}.{token.string}'
+                                self[from_name.split('.')[0]].add_imported_name(name)
+                                if self.events:
+                                    self.events.name_imported(name, source_module, token.start[0])
+                                expect_name = False
                             token = next(tokens)
                     if token.type == tokenize.NAME and token.string in (known_dynamic_loaders):
                         try:
@@ -127,8 +281,37 @@ class ModuleInspection(dict):
                         except StopIteration:
                             # this is not necessarily a SyntaxError, as these are not keywords
                             pass
+                    statement_start = token.type == tokenize.NEWLINE or (
+                        statement_start and token.type in _LAYOUT_TOKENS
+                    )
             except (AssertionError, StopIteration) as err:
                 # If StopIteration is raised, this file contains illegal syntax
                 # This would cause a SyntaxError if run, but caller is already
                 # expecting TokenError
                 raise tokenize.TokenError from err
+
+
+class _FoundImports(Observer):
+    def __init__(self):
+        self.found = []
+
+    def import_found(self, dotted_name, project_file, line_number, dynamic):
+        self.found.append((dotted_name, line_number, dynamic))
+
+    def name_imported(self, dotted_name, project_file, line_number):
+        self.found.append((dotted_name, line_number, None))
+
+
+def _scan_imports(policy, project_file):
+    """Tokenize one file in a worker process, returning what was found for the parent to record"""
+    found = _FoundImports()
+    start = time.perf_counter()
+    scan = policy(project_file) if policy else SCAN
+    if scan == SKIP:
+        return found.found, True, 0.0
+    inspection = ModuleInspection(FOUND_RETENTION, Events([found]))
+    try:
+        inspection.find_imports_from_token(project_file, header_only=scan == HEADER)
+    except tokenize.TokenError:
+        return found.found, False, time.perf_counter() - start
+    return found.found, True, time.perf_counter() - start
@@ -1,16 +1,14 @@
 import logging
-import os
-import stat
-import sysconfig
+from collections import defaultdict
 from configparser import ConfigParser
-from pathlib import Path
 
 import tomli
 
-from packaging import requirements as pkgreq, utils as pkgutil
+from packaging import utils as pkgutil
 
-from ._importlib import dist2pkg, metadata as pkg_metadata
-from ._internal import _Record
+from ._importlib import current_environment
+from ._internal import _Record, EMPTY_SET, EMPTY_TUPLE
+from ._requirements import IncludeGraph, iter_lock_requirements, parse_requirement
 
 
 log = logging.getLogger(__name__)
@@ -19,77 +17,136 @@ log = logging.getLogger(__name__)
 class Package(_Record):
     """Record tracking usage of a package"""
 
+    __slots__ = (
+        'package_name',
+        'environment',
+        'installed',
+        'markers',
+        'extras',
+        '_extends',
+        '_executables',
+    )
+
     @staticmethod
     def _normalize_name(name):
         return pkgutil.canonicalize_name(name)
 
+    @classmethod
+    def _record_key(cls, package_name, environment=None):
+        # the same package may be installed differently in each environment
+        return (cls, cls._normalize_name(package_name), environment or current_environment)
+
     def _executable_files(self):
         """Return executable files provided by this package"""
-        for fname in pkg_metadata.files(self.package_name):
-            # this is the only path that is sure to be on PATH
-            # it is spelled with '/' on all platforms
-            fname = str(fname)
-            if fname.startswith('../../../bin/'):
-                exe_name = fname[13:]
-                fs_path = os.path.join(sysconfig.get_path('purelib'), fname)
-                if (
-                    exe_name
-                    and '/' not in exe_name
-                    and os.path.isfile(fs_path)
-                    and (os.stat(fs_path).st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
-                ):
-                    yield exe_name
-
-    def __init__(self, package_name):
+        return self.environment.executable_files(self.name)
+
+    def __init__(self, package_name, environment=None):
         super().__init__(package_name)
         self.package_name = package_name
-        if self.name in dist2pkg:
-            self.installed = True
-            self.modules = dist2pkg[self.name]
-            metadata = pkg_metadata.distribution(self.name)
-            self.extends = {
-                ep.group.split(':')[0].split('.')[0]
-                for ep in metadata.entry_points
-                if ep.group != 'console_scripts'
-            }
-            self.executables = {
-                ep.name for ep in metadata.entry_points if ep.group == 'console_scripts'
-            }
-            self.executables.update(exe for exe in self._executable_files())
+        self.environment = environment or current_environment
+        self.installed = self.name in self.environment.modules
+        if self.installed:
             log.debug('Package %s was associated with modules %s', self.package_name, self.modules)
-            log.debug(
-                'Package %s was associated with extensions %s', self.package_name, self.extends
-            )
-            log.debug(
-                'Package %s was associated with executables %s', self.package_name, self.executables
-            )
         else:
-            self.installed = False
-            self.modules = []
-            self.extends = set()
-            self.executables = set()
             log.debug('Package %s is not installed', self.package_name)
-        self.markers = []
+        self.markers = EMPTY_TUPLE
+        self.extras = EMPTY_SET
+        # only looked up once needed
+        self._extends = None
+        self._executables = None
+
+    @property
+    def modules(self):
+        """Top-level modules provided by this package, shared with the environment's index"""
+        if not self.installed:
+            return []
+        return self.environment.modules[self.name]
+
+    def add_requirement(self, marker=None, extras=()):
+        """Note a marker and extras this package was required with"""
+        if marker is not None:
+            if self.markers is EMPTY_TUPLE:
+                self.markers = []
+            self.markers.append(marker)
+        if extras:
+            self.extras = self.extras.union(extras)
+
+    @property
+    def extends(self):
+        """Top-level names of the entry point groups this package provides plugins for"""
+        if self._extends is None:
+            if not self.installed:
+                self._extends = EMPTY_SET
+            else:
+                self._extends = {
+                    ep.group.split(':')[0].split('.')[0]
+                    for ep in self.environment.distributions[self.name].entry_points
+                    if ep.group != 'console_scripts'
+                }
+                log.debug(
+                    'Package %s was associated with extensions %s', self.package_name, self._extends
+                )
+        return self._extends
+
+    @property
+    def executables(self):
+        """Names of the commands this package installs
+
+        Finding these scans the package's RECORD for files in a scripts directory, so they are
+        only looked up once needed
+        """
+        if self._executables is None:
+            if not self.installed:
+                self._executables = EMPTY_SET
+            else:
+                executables = {
+                    ep.name
+                    for ep in self.environment.distributions[self.name].entry_points
+                    if ep.group == 'console_scripts'
+                }
+                executables.update(exe for exe in self._executable_files())
+                log.debug(
+                    'Package %s was associated with executables %s', self.package_name, executables
+                )
+                self._executables = executables
+        return self._executables
 
 
 class PackageInspection(dict):
     """Inspect usage of all package requirements by a project"""
 
-    def __init__(self, requirements):
+    def __init__(self, requirements, environment=None):
+        self.environment = environment or current_environment
+        # every file that declared each package
+        self.provenance = defaultdict(set)
+        self._include_graph = IncludeGraph()
+        self._loaded_files = set()
         for req in requirements:
             self._add_from_requirement(req)
 
     def __missing__(self, key):
         ckey = pkgutil.canonicalize_name(key)
         if ckey not in self:
-            self[ckey] = Package(key)
+            self[ckey] = Package(key, self.environment)
         return self[ckey]
 
-    def _add_from_requirement(self, requirement):
-        parsed = pkgreq.Requirement(requirement)
-        self[parsed.name]
-        if parsed.marker:
-            self[parsed.name].markers.append(parsed.marker)
+    def in_environment(self, environment):
+        """Return the same requirements, looked up in another environment"""
+        other = self.__class__([], environment)
+        other.provenance = self.provenance
+        for name, package in self.items():
+            other[name] = Package(package.package_name, environment)
+            for marker in package.markers:
+                other[name].add_requirement(marker)
+            other[name].add_requirement(extras=package.extras)
+        return other
+
+    def _add_from_requirement(self, requirement, source=None):
+        parsed = parse_requirement(requirement)
+        package = self[parsed.name]
+        package.add_requirement(parsed.marker, parsed.extras)
+        if source:
+            self.provenance[package.name].add(source)
 
     def update_from_pyproject(self, pyproject_toml):
         """Add all packages found as requirements in the given pyproject.toml"""
@@ -101,7 +158,7 @@ class PackageInspection(dict):
                 log.info(
                     'Found dependency %s in %s project.dependencies', dependency, pyproject_toml
                 )
-                self._add_from_requirement(dependency)
+                self._add_from_requirement(dependency, str(pyproject_toml))
 
             for opt_name, optionals in project.get('optional-dependencies', {}).items():
                 for optional in optionals:
@@ -111,27 +168,34 @@ class PackageInspection(dict):
                         pyproject_toml,
                         opt_name,
                     )
-                    self._add_from_requirement(optional)
+                    self._add_from_requirement(optional, str(pyproject_toml))
             for dependency in pyproject.get('build-system', {}).get('requires', []):
                 log.info(
                     'Found dependency %s in %s build-system.requires', dependency, pyproject_toml
                 )
-                self._add_from_requirement(dependency)
+                self._add_from_requirement(dependency, str(pyproject_toml))
 
     def update_from_pip_requirements(self, requirements_file):
-        """Add all packages found in the given requirements file"""
-        requirements_file = Path(requirements_file)
-        with requirements_file.open('r') as requirements:
-            for requirement in requirements:
-                requirement = requirement.strip()
-                if requirement.startswith('-r') or requirement.startswith('--requirements'):
-                    sub_requirement = requirement.split()[1].strip()
-                    self.update_from_pip_requirements(requirements_file.parent / sub_requirement)
-                    continue
-                if not requirement or requirement.startswith('#') or requirement.startswith('-'):
-                    continue
-                log.info('Found requirement %s in %s', requirement, requirements_file.name)
-                self._add_from_requirement(requirement)
+        """Add all packages found in the given requirements file and the files it includes"""
+        source = str(requirements_file)
+        for included_file, parsed in self._include_graph.walk(requirements_file):
+            if included_file in self._loaded_files:
+                # already added through another file, only note this file also requires them
+                for requirement, _ in parsed.requirements:
+                    name = pkgutil.canonicalize_name(parse_requirement(requirement).name)
+                    self.provenance[name].add(source)
+                continue
+            self._loaded_files.add(included_file)
+            for requirement, line_number in parsed.requirements:
+                log.info('Found requirement %s in %s:%s', requirement, included_file, line_number)
+                self._add_from_requirement(requirement, source)
+
+    def update_from_lock(self, lock_file):
+        """Add all packages pinned in the given uv.lock, poetry.lock or pdm.lock file"""
+        with open(lock_file, 'r') as lock:
+            for requirement in iter_lock_requirements(lock):
+                log.info('Found requirement %s in %s', requirement, lock_file)
+                self._add_from_requirement(requirement, str(lock_file))
 
     def update_from_setup(self, setup_cfg):
         """Add all packages found in the given setup.cfg file"""
@@ -140,7 +204,7 @@ class PackageInspection(dict):
         for requirement in setup.get('options', 'install_requires', fallback='').splitlines():
             if requirement:
                 log.info('Found requirement %s in %s [options]', requirement, setup_cfg)
-                self._add_from_requirement(requirement)
+                self._add_from_requirement(requirement, str(setup_cfg))
         if 'options.extras_require' in setup:
             for requirements in setup['options.extras_require'].values():
                 for requirement in requirements.splitlines():
@@ -150,4 +214,4 @@ class PackageInspection(dict):
                             requirement,
                             setup_cfg,
                         )
-                        self._add_from_requirement(requirement)
+                        self._add_from_requirement(requirement, str(setup_cfg))
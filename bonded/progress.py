@@ -0,0 +1,120 @@
+import sys
+import time
+
+from rich.console import Console
+from rich.live import Live
+from rich.text import Text
+
+from .events import Observer
+
+
+class ScannerProgress:
+    def __init__(self, name, total=None):
+        self.name = name
+        self.total = total
+        self.files = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def bytes_per_second(self):
+        elapsed = self.elapsed
+        return self.bytes / elapsed if elapsed else 0.0
+
+    @property
+    def eta(self):
+        """Seconds until every file is scanned, if it is known how many there are"""
+        if not self.total or not self.files:
+            return None
+        return self.elapsed / self.files * (self.total - self.files)
+
+
+class Progress(Observer):
+    """Reports files discovered and scanned while a run is under way
+
+    On a terminal this is a live display, otherwise a key=value line is written every
+    `interval` seconds. Scanners report to it through `file_scanned`.
+    """
+
+    def __init__(self, stream=None, interval=5.0):
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.discovered = 0
+        self.scanners = {}
+        self.current = None
+        self._live = None
+        self._last_update = 0.0
+        if self.stream.isatty():
+            self.interval = 0.1
+            self._live = Live(
+                Text(''), console=Console(file=self.stream), transient=True, auto_refresh=False
+            )
+
+    def __enter__(self):
+        if self._live:
+            self._live.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.update(force=True)
+        if self._live:
+            self._live.stop()
+
+    def discover(self, files):
+        """List `files`, counting them as they are found so their scan can estimate an ETA"""
+        found = []
+        self.discovered = 0
+        for found_file in files:
+            found.append(found_file)
+            self.discovered += 1
+            self.update()
+        return found
+
+    def start(self, scanner, total=None):
+        self.current = self.scanners[scanner] = ScannerProgress(scanner, total)
+        self.update(force=True)
+
+    def file_scanned(self, scanner, project_file, seconds, size):
+        if scanner not in self.scanners:
+            self.start(scanner)
+        progress = self.scanners[scanner]
+        progress.files += 1
+        progress.bytes += size
+        self.update()
+
+    def update(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self._last_update < self.interval:
+            return
+        self._last_update = now
+        if self._live:
+            self._live.update(Text(self.describe()), refresh=True)
+        else:
+            print(self.describe(structured=True), file=self.stream, flush=True)
+
+    def describe(self, structured=False):
+        fields = {'discovered': self.discovered}
+        progress = self.current
+        if progress is not None:
+            fields['scanner'] = progress.name
+            fields['scanned'] = (
+                f'{progress.files}/{progress.total}' if progress.total else progress.files
+            )
+            fields['bytes_per_second'] = round(progress.bytes_per_second)
+            if progress.eta is not None:
+                fields['eta_seconds'] = round(progress.eta, 1)
+        if structured:
+            return 'progress ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        line = f'{self.discovered} files discovered'
+        if progress is not None:
+            line += (
+                f', {progress.name}: {fields["scanned"]} scanned'
+                f' at {progress.bytes_per_second / 1024:.0f} KiB/s'
+            )
+            if progress.eta is not None:
+                line += f', ETA {progress.eta:.0f}s'
+        return line
@@ -8,7 +8,12 @@ from typing import Optional, Set
 
 import tomli
 
+from ._archive import is_zip_artifact, ZipArtifact
+from ._evidence import parse_retention
 from ._importlib import dist2pkg, machinery
+from ._policy import FilePolicy, POLICIES, SCAN
+from ._results import partials_search_path
+from .evaluation import parse_target
 
 
 _CWD = os.getcwd()
@@ -23,15 +28,70 @@ class Settings:
     ignore_modules: Set[str] = dataclasses.field(default_factory=set)
     ignore_packages: Set[str] = dataclasses.field(default_factory=set)
     project_modules: Set[str] = dataclasses.field(default_factory=set)
+    targets: Set[str] = dataclasses.field(default_factory=set)
+    environment: Set[str] = dataclasses.field(default_factory=set)
+    image: Optional[str] = None
     report: str = 'table'
+    output: Optional[str] = None
+    results_file: Optional[str] = None
+    changed_files: Set[str] = dataclasses.field(default_factory=set)
+    index: Optional[str] = None
+    shard: Optional[str] = None
+    partials: Set[str] = dataclasses.field(default_factory=set)
     pyproject: Optional[str] = None
     setup: Optional[str] = None
+    workers: Optional[int] = None
+    read_ahead: int = 0
+    scan_processes: int = 0
+    large_file_size: int = 1_000_000
+    large_files: str = 'scan'
+    generated_files: str = 'scan'
+    evidence: str = '10'
+    timings: bool = False
+    timings_file: Optional[str] = None
+    memory_profile: bool = False
+    progress: bool = False
     verbose: int = 0
     quiet: bool = False
 
     def __post_init__(self):
+        if self.workers is not None and self.workers < 1:
+            raise ValueError('--workers must be at least 1')
+        self.retention = parse_retention(self.evidence)
+        for target in self.targets:
+            # a mistyped target fails before scanning rather than once evaluation reaches it
+            parse_target(target)
+        if self.changed_files and not self.results_file:
+            raise ValueError('--changed-files needs the --results-file of an earlier run')
+        if self.read_ahead < 0 or self.scan_processes < 0:
+            raise ValueError('--read-ahead and --scan-processes cannot be negative')
+        for policy in (self.large_files, self.generated_files):
+            if policy not in POLICIES:
+                raise ValueError(f'File policy {policy!r} must be one of {", ".join(POLICIES)}')
+        self.file_policy = None
+        if (self.large_files, self.generated_files) != (SCAN, SCAN):
+            self.file_policy = FilePolicy(
+                self.large_file_size, self.large_files, self.generated_files
+            )
+        self.shard_number, self.shard_count = parse_shard(self.shard) if self.shard else (1, 1)
+        if self.shard and not self.results_file:
+            raise ValueError('--shard needs a --results-file to write what was found to')
+        if self.shard and (self.changed_files or self.index or self.partials):
+            raise ValueError('--shard cannot be used with --changed-files, --index or merge')
+        if (self.results_file or self.index) and (
+            self.image or not os.path.isdir(self.search_path)
+        ):
+            raise ValueError(
+                '--results-file and --index can only be used when search_path is a directory'
+            )
         self._unanchor_exclude()
-        self._locate_project_modules()
+        # a zip search_path is opened once, then scanned in place and closed by whoever scans it
+        self.artifact = None
+        if not self.image and is_zip_artifact(self.search_path):
+            self.artifact = ZipArtifact(self.search_path)
+        if not self.image:
+            # search_path is inside the image, so can only be searched once it is read
+            self._locate_project_modules()
 
     def _unanchor_exclude(self):
         unanchor_exclude = set()
@@ -49,7 +109,9 @@ class Settings:
             if project_name and project_name in dist2pkg:
                 self.project_modules.update(dist2pkg[project_name])
 
-        if os.path.isfile(self.search_path):
+        if self.artifact is not None:
+            self.project_modules.update(self.artifact.project_modules(self.exclude))
+        elif os.path.isfile(self.search_path):
             stem, ext = os.path.splitext(os.path.basename(self.search_path))
             if ext in machinery.SOURCE_SUFFIXES:
                 self.project_modules.add(stem)
@@ -74,9 +136,16 @@ class Settings:
                             self.project_modules.add(stem)
 
     @classmethod
-    def from_interactive(cls):
-        arguments = CLISettings.parse_args(sys.argv[1:])
-        if not hasattr(arguments, 'pyproject'):
+    def from_interactive(cls, argv=None, parser=None):
+        parser = parser or CLISettings
+        arguments = parser.parse_args(sys.argv[1:] if argv is None else argv)
+        if hasattr(arguments, 'partials'):
+            # a merge is always of the search_path the shards scanned
+            arguments.search_path = partials_search_path(arguments.partials)
+        if not hasattr(arguments, 'pyproject') and getattr(arguments, 'image', None):
+            # search_path is inside the image, so any pyproject.toml found here is another project's
+            arguments.pyproject = None
+        elif not hasattr(arguments, 'pyproject'):
             pyproject = Path(getattr(arguments, 'search_path', _CWD)).resolve() / 'pyproject.toml'
             while not pyproject.is_file():
                 if pyproject.parent == pyproject.parent.parent:
@@ -97,9 +166,29 @@ class Settings:
             'ignore_modules': set(),
             'ignore_packages': set(),
             'project_modules': set(),
+            'targets': set(),
+            'environment': set(),
+            'image': None,
             'report': 'table',
+            'output': None,
+            'results_file': None,
+            'changed_files': set(),
+            'index': None,
+            'shard': None,
+            'partials': set(),
             'pyproject': None,
             'setup': None,
+            'workers': None,
+            'read_ahead': 0,
+            'scan_processes': 0,
+            'large_file_size': 1_000_000,
+            'large_files': 'scan',
+            'generated_files': 'scan',
+            'evidence': '10',
+            'timings': False,
+            'timings_file': None,
+            'memory_profile': False,
+            'progress': False,
             'verbose': 0,
             'quiet': False,
         }
@@ -114,53 +203,205 @@ class Settings:
             if isinstance(setting, list):
                 arg_kwargs[kw] = set(setting)
         settings_kwargs.update(arg_kwargs)
-        return cls(**settings_kwargs)
+        try:
+            return cls(**settings_kwargs)
+        except ValueError as err:
+            # a bad value fails like any other bad option, rather than as a traceback
+            parser.error(str(err))
 
 
-CLISettings = argparse.ArgumentParser(argument_default=argparse.SUPPRESS)
-CLISettings.add_argument(
+# every option of a run, shared by the parsers of bonded and bonded merge
+_CLIOptions = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+_CLIOptions.add_argument(
     '--pyproject',
     help='Path to a pyproject.toml which will be searched for requirements and bonded settings',
 )
-CLISettings.add_argument(
+_CLIOptions.add_argument(
     '--setup',
     help='Path to a setup.cfg which will be searched for requirements',
 )
-CLISettings.add_argument(
+_CLIOptions.add_argument(
     '--packages',
     action='extend',
     nargs='+',
     help='Add a package to be checked for',
 )
-CLISettings.add_argument(
+_CLIOptions.add_argument(
     '-r',
     '--requirements',
     action='append',
-    help='Pip-requirements file used to specify further requirements.'
-    ' Can be specified multiple times',
+    help='Pip-requirements file, or uv.lock, poetry.lock or pdm.lock file, used to specify'
+    ' further requirements. Can be specified multiple times',
 )
-CLISettings.add_argument(
+_CLIOptions.add_argument(
     '--ignore-modules',
     action='extend',
     nargs='+',
     help='These module will not be reported as missing a package',
 )
-CLISettings.add_argument(
+_CLIOptions.add_argument(
     '--ignore-packages',
     action='extend',
     nargs='+',
     help='These packages will not be reported as unused',
 )
-CLISettings.add_argument(
+_CLIOptions.add_argument(
     '--exclude',
     action='append',
     help='A glob that will exclude paths otherwise matched',
 )
-CLISettings.add_argument('--report', choices=['table', 'extended-table', 'line', 'none'])
-CLISettings.add_argument('--verbose', '-v', action='count')
-CLISettings.add_argument('--quiet', '-q', action='store_true')
+_CLIOptions.add_argument(
+    '--targets',
+    action='append',
+    help='Marker environment to evaluate requirements against, given as comma separated'
+    ' variable=value pairs, e.g. "python_version=3.9,sys_platform=linux".'
+    ' Can be specified multiple times to report on each target from one scan',
+)
+_CLIOptions.add_argument(
+    '--environment',
+    action='append',
+    help='Path to a venv, site-packages or root filesystem whose installed packages are used'
+    ' instead of those of the running interpreter. Can be specified multiple times',
+)
+_CLIOptions.add_argument(
+    '--image',
+    help='Container image, as a tar (optionally compressed) of its filesystem or an OCI layout'
+    ' directory. search_path and installed packages are read from inside the image without'
+    ' extracting it. No pyproject.toml is looked for unless given with --pyproject',
+)
+_CLIOptions.add_argument(
+    '--report', choices=['table', 'extended-table', 'line', 'jsonl', 'sarif', 'none']
+)
+_CLIOptions.add_argument(
+    '--output',
+    help='File the jsonl or sarif report is written to, instead of stdout',
+)
+_CLIOptions.add_argument(
+    '--results-file',
+    help='File what was found in each scanned file is kept in between runs, for --changed-files',
+)
+_CLIOptions.add_argument(
+    '--changed-files',
+    action='extend',
+    nargs='+',
+    help='Only scan these files, or the files listed on stdin for "-", reusing the'
+    ' --results-file of an earlier run for every other file. Deleted files are dropped from'
+    ' the results',
+)
+_CLIOptions.add_argument(
+    '--index',
+    help='SQLite database every import, and every execution of an executable searched for, is'
+    ' kept in, for "bonded where". Updated with only the files scanned',
+)
+_CLIOptions.add_argument(
+    '--shard',
+    help='Only scan part of search_path, given as i/N for the i-th of N parts, writing what was'
+    ' found to --results-file for "bonded merge" instead of reporting',
+)
+_CLIOptions.add_argument(
+    '--workers',
+    type=int,
+    help='Number of threads used to read installed package metadata.'
+    ' Defaults to a number based on the CPU count',
+)
+_CLIOptions.add_argument(
+    '--read-ahead',
+    type=int,
+    help='Number of files read by background threads ahead of being scanned, which overlaps'
+    ' slow reads, such as from network filesystems, with scanning. Memory use grows with the'
+    ' number. Defaults to 0, reading each file only when it is scanned',
+)
+_CLIOptions.add_argument(
+    '--scan-processes',
+    type=int,
+    help='Number of worker processes files are scanned in, read ahead at least two files per'
+    ' process. Defaults to 0, scanning in the main process',
+)
+_CLIOptions.add_argument(
+    '--large-file-size',
+    type=int,
+    help='Size in bytes above which a file is a large file. Defaults to 1000000',
+)
+_CLIOptions.add_argument(
+    '--large-files',
+    choices=POLICIES,
+    help='Whether large files are scanned for imports, only the imports in their header, before'
+    ' the first statement that is not import related, are, or they are skipped. Defaults to scan',
+)
+_CLIOptions.add_argument(
+    '--generated-files',
+    choices=POLICIES,
+    help='Like --large-files, for files whose first bytes mark them as generated, such as by'
+    ' "@generated" or "DO NOT EDIT". Defaults to scan',
+)
+_CLIOptions.add_argument(
+    '--evidence',
+    help='How much is remembered about where each import and executable was found: "found",'
+    ' "count", "all" or a number of locations to keep. Defaults to 10',
+)
+_CLIOptions.add_argument(
+    '--timings',
+    action='store_true',
+    help='Report the wall and CPU time of each phase of the run, the throughput of each'
+    ' scanner and the files each scanner was slowest on. CPU time includes that of'
+    ' --scan-processes. A directory is walked in its own discovery phase, an image or archive'
+    ' as it is scanned',
+)
+_CLIOptions.add_argument(
+    '--timings-file',
+    help='Also write the timings as JSON to this file',
+)
+_CLIOptions.add_argument(
+    '--memory-profile',
+    action='store_true',
+    help='Trace memory allocations, reporting the peak and retained memory of each phase of'
+    ' the run and where most of it was allocated. Makes the run much slower',
+)
+_CLIOptions.add_argument(
+    '--progress',
+    action='store_true',
+    help='Show files discovered and scanned, throughput and ETA while running. A live display'
+    ' on a terminal, otherwise a line every few seconds on stderr',
+)
+_CLIOptions.add_argument('--verbose', '-v', action='count')
+_CLIOptions.add_argument('--quiet', '-q', action='store_true')
+
+CLISettings = argparse.ArgumentParser(parents=[_CLIOptions], argument_default=argparse.SUPPRESS)
 CLISettings.add_argument('search_path', nargs='?')
 
+MergeSettings = argparse.ArgumentParser(
+    prog='bonded merge',
+    parents=[_CLIOptions],
+    argument_default=argparse.SUPPRESS,
+    description='Evaluate the partial results of every --shard together, as if search_path was'
+    ' scanned at once. search_path is the one the shards scanned',
+)
+MergeSettings.add_argument('partials', nargs='+', metavar='partial')
+
+
+WhereSettings = argparse.ArgumentParser(
+    prog='bonded where',
+    description='List every file and line a module, or any of its submodules, or an executable'
+    ' was found used in, from the --index of an earlier run',
+)
+WhereSettings.add_argument('names', nargs='+', metavar='name')
+WhereSettings.add_argument(
+    '--index',
+    help='The site index to query. Defaults to the index setting of ./pyproject.toml',
+)
+
+
+def parse_shard(shard):
+    """Convert a --shard setting of i/N to the pair (i, N)"""
+    number, _, count = str(shard).partition('/')
+    try:
+        number, count = int(number), int(count)
+    except ValueError:
+        number = count = 0
+    if not 0 < number <= count:
+        raise ValueError(f'Shard {shard!r} must be i/N, for the i-th of N shards counting from 1')
+    return number, count
+
 
 def gather_config(pyproject):
     with open(pyproject, 'rb') as pypj:
@@ -0,0 +1,155 @@
+import heapq
+import itertools
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from .events import Observer
+
+
+SLOWEST_FILES = 10
+TOP_ALLOCATIONS = 5
+
+# allocations made by tracemalloc itself are not part of any phase
+_tracemalloc_filter = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+def file_size(project_file):
+    """The size of a scanned file, without reading it again"""
+    if hasattr(project_file, 'stat'):
+        return project_file.stat().st_size
+    return getattr(project_file, 'size', 0)
+
+
+class ScannerTimings:
+    """Throughput of one scanner, and the files it spent longest on"""
+
+    def __init__(self, name, slowest=SLOWEST_FILES):
+        self.name = name
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self._slowest = []
+        self._keep = slowest
+        self._order = itertools.count()
+
+    def add(self, project_file, seconds, size):
+        self.files += 1
+        self.bytes += size
+        self.seconds += seconds
+        # a min-heap, so the fastest of the slowest files is the one replaced
+        entry = (seconds, next(self._order), str(project_file))
+        if len(self._slowest) < self._keep:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        return [(name, seconds) for seconds, _, name in sorted(self._slowest, reverse=True)]
+
+    def as_dict(self):
+        return {
+            'files': self.files,
+            'bytes': self.bytes,
+            'seconds': self.seconds,
+            'files_per_second': self.files / self.seconds if self.seconds else None,
+            'bytes_per_second': self.bytes / self.seconds if self.seconds else None,
+            'slowest': [{'file': name, 'seconds': seconds} for name, seconds in self.slowest],
+        }
+
+
+class PhaseMemory:
+    """Memory allocated by one phase: its peak, what it left allocated and where"""
+
+    def __init__(self):
+        self.peak = 0
+        self.retained = 0
+        # (allocation site, bytes retained, allocations retained), largest first
+        self.top = []
+
+    def add(self, peak, retained, top, limit=TOP_ALLOCATIONS):
+        self.peak = max(self.peak, peak)
+        self.retained += retained
+        self.top = sorted([*self.top, *top], key=lambda site: site[1], reverse=True)[:limit]
+
+    def as_dict(self):
+        return {
+            'peak_bytes': self.peak,
+            'retained_bytes': self.retained,
+            'top_allocations': [
+                {'site': site, 'bytes': size, 'count': count} for site, size, count in self.top
+            ],
+        }
+
+
+class Timings(Observer):
+    """Wall and CPU time of each phase of a run, and the throughput of each scanner
+
+    Phases are timed with `phase`, to which `add_cpu` adds the CPU time of other processes;
+    scanners observed by a Timings report every file they scan
+    to `file_scanned`. Once `start_memory_profile` is called each phase is also traced with
+    tracemalloc, which slows the run considerably.
+    """
+
+    def __init__(self, slowest=SLOWEST_FILES):
+        # phase -> [wall seconds, cpu seconds], in the order phases first ran
+        self.phases = {}
+        self.scanners = {}
+        # phase -> PhaseMemory, only when profiling memory
+        self.memory = None
+        self._slowest = slowest
+
+    def start_memory_profile(self, frames=1):
+        self.memory = {}
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @contextmanager
+    def phase(self, name):
+        if self.memory is not None:
+            before = tracemalloc.take_snapshot().filter_traces(_tracemalloc_filter)
+            start_size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, [0.0, 0.0])
+            totals[0] += time.perf_counter() - wall
+            totals[1] += time.process_time() - cpu
+            if self.memory is not None:
+                self._measure_memory(name, before, start_size)
+
+    def add_cpu(self, name, seconds):
+        """Add CPU time spent in other processes, such as scanning workers, to a phase"""
+        self.phases.setdefault(name, [0.0, 0.0])[1] += seconds
+
+    def _measure_memory(self, name, before, start_size):
+        size, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(_tracemalloc_filter)
+        top = [
+            (str(stat.traceback), stat.size_diff, stat.count_diff)
+            for stat in after.compare_to(before, 'lineno')[:TOP_ALLOCATIONS]
+            if stat.size_diff > 0
+        ]
+        self.memory.setdefault(name, PhaseMemory()).add(peak - start_size, size - start_size, top)
+
+    def file_scanned(self, scanner, project_file, seconds, size):
+        if scanner not in self.scanners:
+            self.scanners[scanner] = ScannerTimings(scanner, self._slowest)
+        self.scanners[scanner].add(project_file, seconds, size)
+
+    def as_dict(self):
+        return {
+            'phases': {
+                name: {'wall_seconds': wall, 'cpu_seconds': cpu}
+                for name, (wall, cpu) in self.phases.items()
+            },
+            'scanners': {name: scanner.as_dict() for name, scanner in self.scanners.items()},
+            'memory': (
+                {name: memory.as_dict() for name, memory in self.memory.items()}
+                if self.memory is not None
+                else None
+            ),
+        }
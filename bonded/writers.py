@@ -0,0 +1,189 @@
+"""Machine readable reports, written one finding at a time as evaluation proceeds
+
+Nothing here uses rich, so writing these reports never imports it
+"""
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import PurePath
+
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+SARIF_RULES = {
+    'unused-package': 'A required package was not found to be used',
+    'module-without-package': 'A module is imported without a required package providing it',
+}
+
+
+def _uri(file_name):
+    return PurePath(str(file_name)).as_posix()
+
+
+def _file_mode():
+    # what open() would have created the file with, rather than mkstemp's owner only mode
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@contextlib.contextmanager
+def open_output(path=None):
+    """stdout, or the file `path` that is only put in place once the report is complete
+
+    A run that fails part way through leaves behind any earlier report, never a truncated one.
+    Every run writes to a temporary file of its own, so runs at once never write to the same one.
+    """
+    if not path:
+        yield sys.stdout
+        return
+    descriptor, partial = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.', prefix=f'.{os.path.basename(path)}.', suffix='.partial'
+    )
+    try:
+        with os.fdopen(descriptor, 'w') as output:
+            yield output
+        os.chmod(partial, _file_mode())
+        os.replace(partial, path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(partial)
+
+
+def package_finding(evaluation, package):
+    return {
+        'kind': 'package',
+        'name': package.package_name,
+        'confidence': package.confidence.name,
+        'evidence': package.evidence,
+        'installed': package.installed,
+        'modules': sorted(package.modules),
+        'required_by': list(package.required_by),
+        'environment': evaluation.packages.environment.path,
+        'target': evaluation.target,
+    }
+
+
+def module_finding(evaluation, module):
+    return {
+        'kind': 'module',
+        'name': module.name,
+        'confidence': module.confidence.name,
+        'imported_names': sorted(module.imported_names),
+        'imports': module.imports,
+        'locations': [
+            {'file': str(location.file_name), 'line': location.line_number}
+            for location in module.locations
+        ],
+        'installed_through': module.installed_through,
+        'environment': evaluation.packages.environment.path,
+        'target': evaluation.target,
+    }
+
+
+def iter_findings(evaluation):
+    """Yield each finding as soon as it has been evaluated"""
+    for package in evaluation.iter_package_results():
+        if package.unused:
+            yield package_finding(evaluation, package)
+    for module in evaluation.iter_module_results():
+        if module.without_package:
+            yield module_finding(evaluation, module)
+
+
+class JSONLinesWriter:
+    """One JSON object per line for every finding of every evaluation"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, evaluation):
+        for finding in iter_findings(evaluation):
+            self.stream.write(json.dumps(finding))
+            self.stream.write('\n')
+
+    def close(self):
+        self.stream.flush()
+
+
+class SarifWriter:
+    """A SARIF log with a single run, whose results are written as they are found"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._results = 0
+        header = json.dumps(
+            {
+                'version': '2.1.0',
+                '$schema': SARIF_SCHEMA,
+                'runs': [
+                    {
+                        'tool': {
+                            'driver': {
+                                'name': 'bonded',
+                                'informationUri': 'https://github.com/ucodery/bonded',
+                                'rules': [
+                                    {'id': rule, 'shortDescription': {'text': text}}
+                                    for rule, text in SARIF_RULES.items()
+                                ],
+                            }
+                        },
+                        'results': [],
+                    }
+                ],
+            }
+        )
+        # everything up to the empty results array, which is filled in as findings arrive
+        split = header.rindex('[]') + 1
+        self.stream.write(header[:split])
+        self._footer = header[split:]
+
+    def _result(self, finding):
+        if finding['kind'] == 'package':
+            rule = 'unused-package'
+            text = f"Package {finding['name']} is required but was not found to be used"
+            locations = [{'file': required_by} for required_by in finding['required_by']]
+        else:
+            rule = 'module-without-package'
+            text = f"Module {finding['name']} is used without a package providing it"
+            if finding['installed_through']:
+                text += f", it is installed through {' -> '.join(finding['installed_through'])}"
+            locations = finding['locations']
+        return {
+            'ruleId': rule,
+            'level': 'warning',
+            'message': {'text': text},
+            'locations': [
+                {
+                    'physicalLocation': {
+                        'artifactLocation': {'uri': _uri(location['file'])},
+                        **(
+                            {'region': {'startLine': location['line']}}
+                            if location.get('line')
+                            else {}
+                        ),
+                    }
+                }
+                for location in locations
+            ],
+            'properties': finding,
+        }
+
+    def write(self, evaluation):
+        for finding in iter_findings(evaluation):
+            if self._results:
+                self.stream.write(',')
+            self.stream.write(json.dumps(self._result(finding)))
+            self._results += 1
+
+    def close(self):
+        self.stream.write(self._footer)
+        self.stream.write('\n')
+        self.stream.flush()
+
+
+WRITERS = {
+    'jsonl': JSONLinesWriter,
+    'sarif': SarifWriter,
+}
@@ -0,0 +1,126 @@
+import hashlib
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+from bonded._archive import Image, ImageEnvironment, ZipArtifact
+from bonded.events import Events, Observer
+from bonded.module_inspection import ModuleInspection
+from bonded.package_inspection import PackageInspection
+from bonded.settings import Settings
+
+
+class Discovered(Observer):
+    def __init__(self):
+        self.paths = []
+
+    def file_discovered(self, project_file):
+        self.paths.append(str(project_file))
+
+
+def _layer(files, compression=''):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=f'w:{compression}') as tar:
+        for name, content in files.items():
+            member = tarfile.TarInfo(name)
+            member.mode = 0o755 if name.startswith('./usr/bin/') else 0o644
+            member.size = len(content)
+            tar.addfile(member, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def _blob(layout, content):
+    digest = hashlib.sha256(content).hexdigest()
+    (layout / 'blobs' / 'sha256' / digest).write_bytes(content)
+    return {'digest': f'sha256:{digest}', 'size': len(content)}
+
+
+@pytest.fixture()
+def oci_layout(tmp_path):
+    site = './usr/lib/python3.11/site-packages'
+    base = _layer(
+        {
+            f'{site}/foo-1.0.dist-info/METADATA': b'Metadata-Version: 2.1\nName: foo\nVersion: 1\n',
+            f'{site}/foo-1.0.dist-info/RECORD': b'foo/__init__.py,,\n../../../bin/foo,,\n',
+            f'{site}/foo/__init__.py': b'',
+            f'{site}/bar-1.0.dist-info/METADATA': b'Metadata-Version: 2.1\nName: bar\nVersion: 1\n',
+            f'{site}/bar-1.0.dist-info/RECORD': b'bar.py,,\n',
+            f'{site}/bar.py': b'',
+            './usr/bin/foo': b'#!/usr/bin/python\n',
+            './app/main.py': b'import foo\nimport bar\n',
+            './app/old/__init__.py': b'import removed\n',
+            './app/tests/test_main.py': b'import pytest\n',
+        },
+        'gz',
+    )
+    upper = _layer(
+        {
+            f'{site}/.wh.bar-1.0.dist-info': b'',
+            f'{site}/.wh.bar.py': b'',
+            './app/.wh.old': b'',
+            './app/tests/.wh..wh..opq': b'',
+            './app/tests/test_new.py': b'import qux\n',
+        }
+    )
+    layout = tmp_path / 'image'
+    (layout / 'blobs' / 'sha256').mkdir(parents=True)
+    manifest = {'layers': [_blob(layout, base), _blob(layout, upper)]}
+    index = {'manifests': [_blob(layout, json.dumps(manifest).encode())]}
+    (layout / 'index.json').write_text(json.dumps(index))
+    (layout / 'oci-layout').write_text('{"imageLayoutVersion": "1.0.0"}')
+    return str(layout)
+
+
+def test_image_whiteouts(oci_layout):
+    image = Image(oci_layout)
+    discovered = Discovered()
+    python_files = sorted(
+        str(f) for f in image.iter_files('/app', set(), '*.py', Events([discovered]))
+    )
+
+    assert python_files == ['/app/main.py', '/app/tests/test_new.py']
+    assert sorted(discovered.paths) == python_files
+    assert image.project_modules('/app', set()) == {'main', 'test_new'}
+    assert image.project_modules('/app', {'**/tests/**'}) == {'main'}
+
+
+def test_image_scanning(oci_layout):
+    image = Image(oci_layout)
+    modules = ModuleInspection()
+    modules.inspect_imports(image.iter_files('/app', set(), '*.py'))
+
+    assert set(modules) == {'foo', 'bar', 'qux'}
+
+
+def test_image_environment(oci_layout):
+    environment = ImageEnvironment(Image(oci_layout))
+    packages = PackageInspection(['foo', 'bar'], environment)
+
+    assert packages['foo'].installed
+    assert packages['foo'].modules == ['foo']
+    assert packages['foo'].executables == {'foo'}
+    assert not packages['bar'].installed
+
+
+def test_zip_artifact(tmp_path):
+    wheel = tmp_path / 'foo-1.0-py3-none-any.whl'
+    with zipfile.ZipFile(wheel, 'w') as archive:
+        archive.writestr('foo/__init__.py', 'import bar\n')
+        archive.writestr('foo/tests/test_foo.py', 'import pytest\n')
+        archive.writestr('foo_cli.py', "__import__('baz')\n")
+        archive.writestr('foo-1.0.dist-info/RECORD', '')
+    artifact = ZipArtifact(str(wheel))
+    modules = ModuleInspection()
+    discovered = Discovered()
+    modules.inspect_imports(artifact.iter_files({'**/tests/**'}, '*.py', Events([discovered])))
+
+    assert set(modules) == {'bar', 'baz'}
+    assert discovered.paths == [f'{wheel}/foo/__init__.py', f'{wheel}/foo_cli.py']
+    assert artifact.project_modules(set()) == {'foo', 'foo_cli'}
+    artifact.close()
+    settings = Settings(search_path=str(wheel))
+    with settings.artifact:
+        assert settings.project_modules == {'foo', 'foo_cli'}
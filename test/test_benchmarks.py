@@ -0,0 +1,32 @@
+from benchmarks.__main__ import PHASES, run
+from benchmarks.synthetic import generate_site_packages, generate_tree
+
+from bonded import _importlib
+
+
+def test_synthetic_environment(tmp_path):
+    generate_site_packages(str(tmp_path), distributions=5, entry_points=1, scripts=2)
+    environment = _importlib.Environment(str(tmp_path))
+
+    assert sorted(environment.distributions) == [f'dist-{number:05}' for number in range(5)]
+    assert environment.modules['dist-00001'] == ['dist_00001']
+    assert environment.executable_files('dist-00001') == {
+        'dist-00001-cli',
+        'dist-00001-tool-0',
+        'dist-00001-tool-1',
+    }
+
+
+def test_synthetic_tree(tmp_path):
+    generate_tree(str(tmp_path), files=30, vendored=1, large_files=1, large_file_lines=10)
+
+    python_files = list(tmp_path.glob('project/**/*.py'))
+    assert len([path for path in python_files if path.name.startswith('module_')]) > 30
+    assert (tmp_path / 'project' / 'generated_0.py').read_text().count('\n') == 11
+
+
+def test_benchmark_run():
+    [result] = run([20], import_density=3, vendored=0, large_files=0, binary_blobs=0)
+
+    assert result['python_files'] >= 20
+    assert list(result['phases']) == PHASES
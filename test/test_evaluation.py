@@ -0,0 +1,177 @@
+import pytest
+
+from bonded import _importlib, _internal
+from bonded.evaluation import Confidence, Evaluation, executables_to_inspect, parse_target
+from bonded.events import Events, Observer
+from bonded.executable_inspection import ExecutableInspection
+from bonded.module_inspection import ModuleInspection
+from bonded.package_inspection import PackageInspection
+from bonded.settings import Settings
+
+
+@pytest.fixture()
+def settings(tmp_path):
+    return Settings(search_path=str(tmp_path))
+
+
+def test_parse_target():
+    assert parse_target('sys_platform=darwin') == {'sys_platform': 'darwin'}
+    assert parse_target('python_version=3.9, sys_platform = linux') == {
+        'python_version': '3.9',
+        'python_full_version': '3.9.0',
+        'sys_platform': 'linux',
+    }
+    assert parse_target('python_full_version=3.12.1') == {
+        'python_version': '3.12',
+        'python_full_version': '3.12.1',
+    }
+    with pytest.raises(ValueError):
+        parse_target('python_version')
+    with pytest.raises(ValueError):
+        parse_target('not_a_marker=1')
+
+
+def test_target_platform_ignored(settings):
+    packages = PackageInspection(
+        ['bonded; python_version < "3.9"', 'packaging; sys_platform == "win32"']
+    )
+    old_linux = Evaluation(
+        packages, {}, {}, settings, target='python_version=3.8,sys_platform=linux'
+    )
+    new_windows = Evaluation(
+        packages, {}, {}, settings, target='python_version=3.12,sys_platform=win32'
+    )
+
+    assert old_linux.evaluate_package('bonded') != Confidence.SKIPPED
+    assert old_linux.evaluate_package('packaging') == Confidence.SKIPPED
+    assert new_windows.evaluate_package('bonded') == Confidence.SKIPPED
+    assert new_windows.evaluate_package('packaging') != Confidence.SKIPPED
+
+
+def test_imported_package_skips_executables(settings, tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    (tmp_path / 'main.py').write_text('import packaging\n')
+    modules = ModuleInspection()
+    modules.inspect_imports([tmp_path / 'main.py'])
+    packages = PackageInspection(['bonded', 'packaging'])
+
+    assert list(executables_to_inspect(settings, modules, packages)) == ['bonded']
+    assert packages['packaging']._executables is None
+    evaluation = Evaluation(packages, modules, ExecutableInspection([]), settings)
+    assert evaluation.evaluate_package('packaging') == Confidence.VERY_HIGH
+    assert packages['packaging']._executables is None
+
+
+def _install(site_packages, name, files, requires=()):
+    dist_info = site_packages / f'{name}-1.0.dist-info'
+    dist_info.mkdir(parents=True)
+    (dist_info / 'METADATA').write_text(
+        f'Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n'
+        + ''.join(f'Requires-Dist: {requirement}\n' for requirement in requires)
+    )
+    (dist_info / 'RECORD').write_text(''.join(f'{file},,\n' for file in files))
+    for file in files:
+        (site_packages / file).parent.mkdir(parents=True, exist_ok=True)
+        (site_packages / file).touch()
+
+
+def test_namespace_package_resolution(settings, tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    site_packages = tmp_path / 'env' / 'lib' / 'python3.99' / 'site-packages'
+    _install(site_packages, 'ns-auth', ['ns/auth/__init__.py', 'ns/auth/transport.py'])
+    _install(site_packages, 'ns-core', ['ns/core/__init__.py', 'ns/_helpers.py'])
+    environment = _importlib.Environment(str(tmp_path / 'env'))
+    (tmp_path / 'main.py').write_text('from ns.auth import transport\n')
+    modules = ModuleInspection()
+    modules.inspect_imports([tmp_path / 'main.py'])
+
+    trie = environment.module_trie
+    assert trie.resolve('ns.auth.transport') == {'ns-auth'}
+    assert trie.resolve('ns._helpers') == {'ns-core'}
+    assert trie.resolve('ns') == {'ns-auth', 'ns-core'}
+
+    both = Evaluation(PackageInspection(['ns-auth', 'ns-core'], environment), modules, {}, settings)
+    assert both.evaluate_package('ns-auth') == Confidence.VERY_HIGH
+    assert both.evaluate_package('ns-core') == Confidence.NONE
+    assert not both.module_report()
+
+    core_only = Evaluation(PackageInspection(['ns-core'], environment), modules, {}, settings)
+    assert core_only.module_report() == {modules['ns']}
+
+
+def test_dependency_path(settings, tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    site_packages = tmp_path / 'env' / 'lib' / 'python3.99' / 'site-packages'
+    _install(site_packages, 'app', ['app.py'], ['web[fast]', 'win; sys_platform == "win32"'])
+    _install(site_packages, 'web', ['web.py'], ['http', 'speedups; extra == "fast"'])
+    _install(site_packages, 'http', ['http_lib.py'], ['web'])
+    _install(site_packages, 'speedups', ['speedups.py'])
+    _install(site_packages, 'win', ['win.py'])
+    environment = _importlib.Environment(str(tmp_path / 'env'))
+    (tmp_path / 'main.py').write_text('import app, http_lib, speedups, win\n')
+    modules = ModuleInspection()
+    modules.inspect_imports([tmp_path / 'main.py'])
+    packages = PackageInspection(['app'], environment)
+
+    linux = Evaluation(packages, modules, {}, settings, target='sys_platform=linux')
+    assert linux.module_report() == {modules['http_lib'], modules['speedups'], modules['win']}
+    assert linux.dependency_path('http_lib') == ('app', 'web', 'http')
+    assert linux.dependency_path('speedups') == ('app', 'web', 'speedups')
+    assert linux.dependency_path('win') is None
+    assert linux.dependency_graph.closure('app') == {'web', 'http', 'speedups'}
+    assert linux.dependency_graph.closure('web') == {'web', 'http'}
+
+    windows = Evaluation(packages, modules, {}, settings, target='sys_platform=win32')
+    assert windows.dependency_path('win') == ('app', 'win')
+
+
+def test_result_computed_once(settings, tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    (tmp_path / 'main.py').write_text('import packaging\nimport not_installed_anywhere\n')
+    modules = ModuleInspection()
+    modules.inspect_imports([tmp_path / 'main.py'])
+    evaluation = Evaluation(PackageInspection(['bonded', 'packaging']), modules, {}, settings)
+
+    result = evaluation.result()
+    assert evaluation.result() is result
+    with pytest.raises(TypeError):
+        result.packages['bonded'] = None
+    assert [package.name for package in result.unused_packages] == ['bonded']
+    assert [module.name for module in result.modules_without_package] == ['not_installed_anywhere']
+    assert evaluation.package_report() == {evaluation.packages['bonded']}
+    assert not result.passes()
+
+    from bonded.display import format_line_output
+
+    assert format_line_output(settings, result) == (
+        'Packages: bonded\nModules: not_installed_anywhere'
+    )
+
+
+def test_results_streamed(settings, tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    (tmp_path / 'main.py').write_text('import packaging\n')
+    modules = ModuleInspection()
+    modules.inspect_imports([tmp_path / 'main.py'])
+    evaluated = []
+
+    class Recorder(Observer):
+        def package_evaluated(self, package, confidence, source):
+            evaluated.append(package)
+
+    evaluation = Evaluation(
+        PackageInspection(['bonded', 'packaging']),
+        modules,
+        {},
+        settings,
+        events=Events([Recorder()]),
+    )
+
+    first = next(evaluation.iter_package_results())
+    assert evaluated == [first.name]
+    # what was already yielded is kept, not evaluated again
+    result = evaluation.result()
+    assert sorted(evaluated) == ['bonded', 'packaging']
+    assert list(evaluation.iter_package_results()) == list(result.packages.values())
+    assert list(evaluation.iter_module_results()) == list(result.modules.values())
+    assert sorted(evaluated) == ['bonded', 'packaging']
@@ -0,0 +1,79 @@
+import pytest
+
+from bonded import _internal
+from bonded.__main__ import iter_source_files
+from bonded.evaluation import Confidence, Evaluation
+from bonded.events import Events, NO_EVENTS, Observer
+from bonded.executable_inspection import ExecutableInspection
+from bonded.module_inspection import ModuleInspection
+from bonded.package_inspection import PackageInspection
+from bonded.settings import Settings
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def file_discovered(self, project_file):
+        self.events.append(('discovered', project_file.name))
+
+    def import_found(self, dotted_name, project_file, line_number, dynamic):
+        self.events.append(('import', dotted_name, line_number, dynamic))
+
+    def executable_found(self, executable, project_file, line_number, file_type):
+        self.events.append(('executable', executable, project_file.name, line_number))
+
+    def package_evaluated(self, package, confidence, source):
+        self.events.append(('package', package, confidence, source))
+
+
+def test_no_events():
+    assert not NO_EVENTS
+    assert Events([Observer()])
+    # the default of every scanner cannot be used to observe them all
+    for add in (
+        lambda: ModuleInspection().events.append(Observer()),
+        lambda: NO_EVENTS.extend([Observer()]),
+        lambda: NO_EVENTS.insert(0, Observer()),
+    ):
+        with pytest.raises(TypeError):
+            add()
+    assert not NO_EVENTS
+
+
+def test_pipeline_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    (tmp_path / 'main.py').write_text('import packaging.version\n\nimport_module("tomli")\n')
+    (tmp_path / 'tox.ini').write_text('[testenv]\ncommands = bonded\n')
+    recorder = Recorder()
+    events = Events([recorder])
+
+    all_files = list(iter_source_files(str(tmp_path), set(), '*', events))
+    modules = ModuleInspection(events=events)
+    modules.inspect_imports(path for path in all_files if path.suffix == '.py')
+    executables = ExecutableInspection(['bonded'], events=events)
+    executables.inspect_executables(all_files)
+    settings = Settings(search_path=str(tmp_path))
+    evaluation = Evaluation(
+        PackageInspection(['bonded', 'packaging', 'missing']),
+        modules,
+        executables,
+        settings,
+        events=events,
+    )
+    evaluation.passes()
+
+    assert sorted(event for event in recorder.events if event[0] == 'discovered') == [
+        ('discovered', 'main.py'),
+        ('discovered', 'tox.ini'),
+    ]
+    assert [event for event in recorder.events if event[0] in ('import', 'executable')] == [
+        ('import', 'packaging.version', 1, False),
+        ('import', 'tomli', 3, True),
+        ('executable', 'bonded', 'tox.ini', 2),
+    ]
+    assert sorted(event for event in recorder.events if event[0] == 'package') == [
+        ('package', 'bonded', Confidence.MEDIUM, 'executables'),
+        ('package', 'missing', Confidence.NONE, 'not installed'),
+        ('package', 'packaging', Confidence.VERY_HIGH, 'modules'),
+    ]
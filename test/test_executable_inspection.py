@@ -0,0 +1,56 @@
+import pytest
+
+from bonded import _internal
+from bonded._evidence import Evidence, Location, parse_retention, Retention
+from bonded.executable_inspection import ExecutableInspection
+
+
+@pytest.fixture(autouse=True)
+def record_cache(monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+
+
+@pytest.fixture()
+def project_files(tmp_path):
+    (tmp_path / 'tox.ini').write_text('commands =\n    pytest\n    pytest --lf\n')
+    (tmp_path / 'Makefile').write_text('test:\n\tpytest\n')
+    return sorted(tmp_path.iterdir())
+
+
+def test_parse_retention():
+    assert parse_retention('found') == Retention(0, False)
+    assert parse_retention('count') == Retention(0, True)
+    assert parse_retention('all') == Retention(None, True)
+    assert parse_retention('3') == Retention(3, True)
+    with pytest.raises(ValueError):
+        parse_retention('some')
+    with pytest.raises(ValueError):
+        parse_retention('-1')
+
+
+@pytest.mark.parametrize(
+    'retention, count, retained',
+    [
+        ('found', 1, 0),
+        ('count', 3, 0),
+        ('2', 3, 2),
+        ('all', 3, 3),
+    ],
+)
+def test_retention(project_files, retention, count, retained):
+    executables = ExecutableInspection(['pytest'], parse_retention(retention))
+    executables.inspect_executables(project_files)
+    found = executables['pytest'].found_executions
+    assert found
+    assert len(found) == count
+    assert len(list(found)) == retained
+
+
+def test_evidence_locations():
+    evidence = Evidence(parse_retention('all'))
+    evidence.add('tox.ini', 'ini', 2)
+    evidence.add('tox.ini', 'ini', 3)
+    assert not Evidence()
+    assert list(evidence) == [Location('tox.ini', 'ini', 2), Location('tox.ini', 'ini', 3)]
+    file_names = [location.file_name for location in evidence]
+    assert file_names[0] is file_names[1]
@@ -0,0 +1,79 @@
+import sys
+
+from bonded import _internal
+from bonded.__main__ import main
+from bonded._index import find_sites, open_index
+
+
+def _run(monkeypatch, *arguments):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    monkeypatch.setattr(sys, 'argv', ['bonded', *arguments])
+    return main()
+
+
+def _sites(index, name):
+    connection = open_index(str(index))
+    try:
+        return [site[1:] for site in find_sites(connection, name)]
+    finally:
+        connection.close()
+
+
+def test_index(tmp_path, monkeypatch, capsys):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'a.py').write_text('import packaging.version\nfrom packaging import markers\n')
+    (project / 'b.py').write_text('import_module("packaging")\nimport packages\n')
+    (project / 'c.py').write_text('import packaging\n')
+    index = tmp_path / 'index.sqlite'
+    results_file = tmp_path / 'results.json'
+    arguments = ['--pyproject', '', '--report', 'none', '--packages', 'packaging']
+    arguments += ['--index', str(index), '--results-file', str(results_file), str(project)]
+
+    _run(monkeypatch, *arguments)
+    assert _sites(index, 'packaging') == [
+        (1, 'import', 'packaging.version'),
+        (2, 'import', 'packaging'),
+        (2, 'from import', 'packaging.markers'),
+        (1, 'dynamic import', 'packaging'),
+        (1, 'import', 'packaging'),
+    ]
+    assert _sites(index, 'packaging.markers') == [(2, 'from import', 'packaging.markers')]
+
+    (project / 'b.py').write_text('\n\nimport packaging\n')
+    (project / 'c.py').unlink()
+    _run(monkeypatch, *arguments, '--changed-files', str(project / 'b.py'), str(project / 'c.py'))
+    assert [site.path for site in find_sites(open_index(str(index)), 'packaging')] == [
+        str(project / 'a.py'),
+        str(project / 'a.py'),
+        str(project / 'a.py'),
+        str(project / 'b.py'),
+    ]
+    assert _sites(index, 'packaging')[-1] == (3, 'import', 'packaging')
+    assert not _sites(index, 'packages')
+
+    capsys.readouterr()
+    assert _run(monkeypatch, 'where', 'packaging.version', '--index', str(index)) == 0
+    assert capsys.readouterr().out.endswith('a.py:1: import packaging.version\n')
+    assert _run(monkeypatch, 'where', 'nothing', '--index', str(index)) == 1
+
+
+def test_emptied_file(tmp_path, monkeypatch, capsys):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'a.py').write_text('import packaging\n')
+    (project / 'run.sh').write_text('#!/bin/sh\npip install .\n')
+    index = tmp_path / 'index.sqlite'
+    arguments = ['--pyproject', '', '--report', 'none', '--packages', 'packaging', 'pip']
+    arguments += ['--index', str(index), '--results-file', str(tmp_path / 'results.json')]
+
+    _run(monkeypatch, *arguments, str(project))
+    assert _sites(index, 'pip') == [(2, 'executable', 'pip')]
+
+    # an emptied file has nothing to find, but what was found in it before must still go
+    (project / 'run.sh').write_text('')
+    _run(monkeypatch, *arguments, str(project), '--changed-files', str(project / 'run.sh'))
+    assert _sites(index, 'pip') == []
+    capsys.readouterr()
+    assert _run(monkeypatch, 'where', 'pip', '--index', str(index)) == 1
+    assert capsys.readouterr().out == ''
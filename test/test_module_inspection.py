@@ -1,6 +1,7 @@
 import pytest
 
-from bonded.module_inspection import ModuleInspection
+from bonded._policy import FilePolicy
+from bonded.module_inspection import Found, Module, ModuleInspection
 
 
 @pytest.fixture(autouse=True)
@@ -40,6 +41,23 @@ def test_import_statement(python_file, module_inspection):
     assert module_inspection['foo'].found_import_stmt
 
 
+@pytest.mark.parametrize(
+    'code, imported_names',
+    [
+        ('import foo', {'foo'}),
+        ('import foo.bar.baz as qux', {'foo.bar.baz'}),
+        ('from foo.bar import baz, qux as xuq', {'foo.bar', 'foo.bar.baz', 'foo.bar.qux'}),
+        ('from foo import (bar,\nbaz)', {'foo', 'foo.bar', 'foo.baz'}),
+        ('from foo import *', {'foo'}),
+        ('importlib.import_module("foo.bar")', {'foo.bar'}),
+    ],
+)
+def test_imported_names(python_file, module_inspection, imported_names):
+    module_inspection.find_imports_from_token(python_file)
+    assert list(module_inspection) == ['foo']
+    assert module_inspection['foo'].imported_names == imported_names
+
+
 @pytest.mark.parametrize(
     'code',
     [
@@ -180,3 +198,44 @@ def test_unparsable_python(python_file, module_inspection):
     with pytest.warns(Warning):
         module_inspection.inspect_imports([python_file])
     assert not module_inspection
+
+
+def test_compact_records():
+    module = Module('foo')
+    assert not hasattr(module, '__dict__')
+    assert module.imported_names is Module('bar').imported_names
+    module.found_import_fun = True
+    assert module.found == Found.IMPORT_FUNCTION
+    assert module.found_import_fun and not module.found_import_stmt
+
+
+@pytest.mark.parametrize(
+    'code',
+    [
+        '"""doc"""\nimport foo\n__all__ = [\n"x",\n]\nx = 1\nimport late',
+        '# comment\ntry:\n    import foo\nexcept ImportError:\n    foo = None\n'
+        'def f():\n    import late',
+        'if TYPE_CHECKING:\n    import foo\nclass Late:\n    import late',
+        'from foo import (\nbar,\n)\n\n\n@decorator\ndef f():\n    import late',
+    ],
+)
+def test_header_only(python_file, module_inspection):
+    module_inspection.find_imports_from_token(python_file, header_only=True)
+    assert 'foo' in module_inspection
+    assert 'late' not in module_inspection
+
+
+@pytest.mark.parametrize(
+    'code',
+    ['# Generated by the protocol buffer compiler.  DO NOT EDIT!\nimport foo\nx = 1\nimport late'],
+)
+def test_file_policy(python_file):
+    assert FilePolicy(10, 'scan', 'scan')(python_file) == 'scan'
+    assert FilePolicy(10, 'header', 'scan')(python_file) == 'header'
+    assert FilePolicy(1000, 'header', 'scan')(python_file) == 'scan'
+    assert FilePolicy(1000, 'scan', 'skip')(python_file) == 'skip'
+    assert FilePolicy(10, 'skip', 'header')(python_file) == 'skip'
+
+    modules = ModuleInspection(policy=FilePolicy(1000, 'scan', 'header'))
+    modules.inspect_imports([python_file])
+    assert set(modules) == {'foo'}
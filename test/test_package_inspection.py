@@ -1,4 +1,5 @@
-from bonded.package_inspection import Package
+from bonded import _importlib, _internal
+from bonded.package_inspection import Package, PackageInspection
 
 
 def test_uninstalled_package():
@@ -19,11 +20,189 @@ def test_equivilant_packages():
     assert bonded is Bonded
 
 
-def test_loading_self():
+def test_loading_self(monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
     bonded = Package('bonded')
+    # entry points and RECORD are not read until needed
+    assert bonded._extends is None
+    assert bonded._executables is None
 
     assert bonded.package_name == 'bonded'
     assert bonded.name == 'bonded'
     assert bonded.modules == ['bonded']
     assert bonded.extends == set()
     assert bonded.executables == {'bonded'}
+
+
+def test_pip_requirements(tmp_path):
+    (tmp_path / 'constraints.txt').write_text('not-a-dependency==1.0\n')
+    requirements = tmp_path / 'requirements.txt'
+    requirements.write_text(
+        '# a pip-compile style file\n'
+        '-c constraints.txt\n'
+        '--index-url https://example.com/simple\n'
+        'foo==1.0 \\\n'
+        '    --hash=sha256:0000 \\\n'
+        '    --hash=sha256:1111\n'
+        '    # via bar\n'
+        'bar[extra]>=2  # trailing comment\n'
+        "baz; sys_platform == 'win32' --hash=sha256:2222\n"
+    )
+    packages = PackageInspection([])
+    packages.update_from_pip_requirements(requirements)
+
+    assert set(packages) == {'foo', 'bar', 'baz'}
+    assert [str(m) for m in packages['baz'].markers] == ['sys_platform == "win32"']
+
+
+def test_lock_file(tmp_path):
+    lock = tmp_path / 'uv.lock'
+    lock.write_text(
+        'version = 1\n'
+        'requires-python = ">=3.9"\n'
+        '\n'
+        '[[package]]\n'
+        'name = "project"\n'
+        'version = "0.1.0"\n'
+        'source = { editable = "." }\n'
+        'dependencies = [\n'
+        '    { name = "foo" },\n'
+        ']\n'
+        '\n'
+        '[[package]]\n'
+        'name = "Foo"\n'
+        'version = "1.0"\n'
+        'wheels = [\n'
+        '    { url = "https://example.com/foo-1.0-py3-none-any.whl" },\n'
+        ']\n'
+        '\n'
+        '[package.optional-dependencies]\n'
+        'extra = [{ name = "bar" }]\n'
+        '\n'
+        '[[package]]\n'
+        'name = "bar"\n'
+        'version = "2.0"\n'
+        'marker = "python_version < \'3.10\'"\n'
+        '\n'
+        '[metadata]\n'
+        'lock-version = "2.0"\n'
+    )
+    packages = PackageInspection([])
+    packages.update_from_lock(lock)
+
+    assert set(packages) == {'foo', 'bar'}
+    assert [str(m) for m in packages['bar'].markers] == ['python_version < "3.10"']
+
+
+def test_included_requirements(tmp_path, caplog):
+    (tmp_path / 'base.txt').write_text('foo; python_version >= "3"\n-r common.txt\n')
+    (tmp_path / 'common.txt').write_text('bar\n-r base.txt\n')
+    (tmp_path / 'test.txt').write_text('-r base.txt\nbaz\n')
+    (tmp_path / 'docs.txt').write_text('--requirement=base.txt\n-r common.txt\nqux\n')
+    packages = PackageInspection([])
+    packages.update_from_pip_requirements(tmp_path / 'test.txt')
+    packages.update_from_pip_requirements(tmp_path / 'docs.txt')
+
+    assert set(packages) == {'foo', 'bar', 'baz', 'qux'}
+    # each file is only read, and its requirements only added, once
+    assert len(packages._include_graph.files) == 4
+    assert len(packages['foo'].markers) == 1
+    assert 'forming a cycle' in caplog.text
+    test, docs = str(tmp_path / 'test.txt'), str(tmp_path / 'docs.txt')
+    assert packages.provenance == {
+        'foo': {test, docs},
+        'bar': {test, docs},
+        'baz': {test},
+        'qux': {docs},
+    }
+
+
+def test_parallel_metadata_loading():
+    serial = _importlib.Environment(workers=1)
+    serial_distributions, serial_modules = serial._load_distribution_index()
+    parallel = _importlib.Environment(workers=8)
+    parallel_distributions, parallel_modules = parallel._load_distribution_index()
+
+    assert list(serial_distributions) == list(parallel_distributions)
+    assert serial_modules == parallel_modules
+    assert parallel_modules['bonded'] == ['bonded']
+
+
+def test_foreign_environment(tmp_path):
+    site_packages = tmp_path / 'lib' / 'python3.99' / 'site-packages'
+    dist_info = site_packages / 'Foo_Bar-1.0.dist-info'
+    dist_info.mkdir(parents=True)
+    (dist_info / 'METADATA').write_text('Metadata-Version: 2.1\nName: Foo_Bar\nVersion: 1.0\n')
+    (dist_info / 'entry_points.txt').write_text(
+        '[console_scripts]\nfoo = foo:main\n\n[pytest11]\nfoo = foo.plugin\n'
+    )
+    (dist_info / 'RECORD').write_text(
+        'foo/__init__.py,,\n'
+        '../../../bin/foo,,\n'
+        '../../../bin/foo-helper,,\n'
+        'Foo_Bar-1.0.dist-info/RECORD,,\n'
+    )
+    (site_packages / 'foo').mkdir()
+    (site_packages / 'foo' / '__init__.py').touch()
+    (tmp_path / 'bin').mkdir()
+    (tmp_path / 'bin' / 'foo-helper').touch(mode=0o755)
+    environment = _importlib.Environment(str(tmp_path))
+    packages = PackageInspection(['foo-bar', 'bonded'], environment)
+
+    assert environment.site_directories == [str(site_packages)]
+    assert packages['foo-bar'].installed
+    assert packages['foo-bar'].modules == ['foo']
+    assert packages['foo-bar'].extends == {'pytest11'}
+    assert packages['foo-bar'].executables == {'foo', 'foo-helper'}
+    assert not packages['bonded'].installed
+    assert packages['foo-bar'] is not Package('foo-bar')
+    assert packages.in_environment(_importlib.current_environment)['bonded'].installed
+
+
+def test_scripts_index(tmp_path, monkeypatch):
+    # a user install on Windows puts scripts beside site-packages rather than in <prefix>/bin
+    user_base = tmp_path / 'Python311'
+    site_packages = user_base / 'site-packages'
+    dist_info = site_packages / 'foo-1.0.dist-info'
+    dist_info.mkdir(parents=True)
+    (dist_info / 'METADATA').write_text('Metadata-Version: 2.1\nName: foo\nVersion: 1.0\n')
+    (dist_info / 'RECORD').write_text(
+        'foo/__init__.py,,\n'
+        '../Scripts/foo.exe,sha256=abc,100\n'
+        '"../Scripts/foo helper.exe",,\n'
+        '../Scripts/foo.txt,,\n'
+        '../Scripts/missing.exe,,\n'
+        '../elsewhere/bar,,\n'
+        'foo-1.0.dist-info/RECORD,,\n'
+    )
+    other_info = site_packages / 'other-1.0.dist-info'
+    other_info.mkdir()
+    (other_info / 'METADATA').write_text('Metadata-Version: 2.1\nName: other\nVersion: 1.0\n')
+    (other_info / 'RECORD').write_text('../Scripts/bar,,\n')
+    scripts = user_base / 'Scripts'
+    scripts.mkdir()
+    for executable in ('foo.exe', 'foo helper.exe', 'bar'):
+        (scripts / executable).touch(mode=0o755)
+    (scripts / 'foo.txt').touch(mode=0o644)
+    monkeypatch.setattr(_importlib, '_scripts_directories', lambda: [str(scripts)])
+    environment = _importlib.Environment()
+    monkeypatch.setattr(
+        environment,
+        '_find_distributions',
+        lambda: [_importlib.metadata.PathDistribution(info) for info in (dist_info, other_info)],
+    )
+    records_read = []
+    scripts_installed_by = _importlib._scripts_installed_by
+    monkeypatch.setattr(
+        _importlib,
+        '_scripts_installed_by',
+        lambda dist, scripts: records_read.append(dist.name) or scripts_installed_by(dist, scripts),
+    )
+
+    # only files in a scripts directory that are executable, and that RECORD puts there, count
+    assert environment.executable_files('foo') == {'foo.exe', 'foo helper.exe'}
+    assert environment.executable_files('foo') == {'foo.exe', 'foo helper.exe'}
+    # only the RECORD of the distribution asked about is read, and only once
+    assert records_read == ['foo']
+    assert environment.executable_files('other') == {'bar'}
+    assert environment.executable_files('not-installed') == set()
@@ -0,0 +1,97 @@
+import os
+import pickle
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from bonded import _internal
+from bonded._pipeline import bounded_map, largest_first_map, read_ahead, ReadFile, ScanPool
+from bonded.executable_inspection import ExecutableInspection
+from bonded.module_inspection import ModuleInspection
+
+
+def test_bounded_map():
+    submitted = []
+
+    def items():
+        for item in range(10):
+            submitted.append(item)
+            yield item
+
+    with ThreadPoolExecutor(2) as pool:
+        mapped = bounded_map(pool, lambda item: item * 2, items(), 3)
+        assert next(mapped) == (0, 0)
+        assert submitted == [0, 1, 2]
+        assert list(mapped) == [(item, item * 2) for item in range(1, 10)]
+
+
+def test_read_ahead(tmp_path):
+    (tmp_path / 'a.py').write_bytes(b'import os\n')
+    missing = tmp_path / 'missing.py'
+
+    read = list(read_ahead([tmp_path / 'a.py', missing], 2))
+    assert isinstance(read[0], ReadFile)
+    assert read[0].read_bytes() == b'import os\n'
+    assert os.fspath(read[0]) == str(tmp_path / 'a.py')
+    assert read[1] is missing
+
+
+def _inspect(monkeypatch, project_files, pool=None):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    modules = ModuleInspection()
+    modules.inspect_imports(project_files, pool)
+    executables = ExecutableInspection(['bonded'])
+    executables.inspect_executables(project_files, pool=pool)
+    return (
+        {
+            name: (module.found, module.imported_names, list(module.found_imports))
+            for name, module in modules.items()
+        },
+        list(executables['bonded'].found_executions),
+    )
+
+
+def test_scan_pool(tmp_path, monkeypatch):
+    for i in range(6):
+        (tmp_path / f'm{i}.py').write_text(
+            f'from packaging import version\nimport_module("mod{i % 2}")\n# bonded\n'
+        )
+    project_files = sorted(tmp_path.iterdir())
+
+    inline = _inspect(monkeypatch, project_files)
+    with ScanPool(2, 4) as pool:
+        assert _inspect(monkeypatch, list(read_ahead(project_files, 4)), pool) == inline
+        # the workers' CPU time, which the main process's own never includes
+        assert pool.take_cpu_seconds() > 0
+        assert pool.take_cpu_seconds() == 0
+
+
+def test_scan_pool_sends_names(tmp_path, monkeypatch):
+    (tmp_path / 'run.sh').write_text('bonded --help\n')
+    sent = []
+
+    class RecordingPool(ScanPool):
+        def map_ahead(self, function, items):
+            sent.append(pickle.dumps(function))
+            return super().map_ahead(function, items)
+
+    with RecordingPool(1, 2) as pool:
+        assert _inspect(monkeypatch, [tmp_path / 'run.sh'], pool)[1]
+    # the searches are compiled in each worker, not pickled with every file
+    assert sent and not any(b'_compile' in function for function in sent)
+    assert b'_compile' in pickle.dumps(re.compile(b'bonded'))
+
+
+def test_largest_first(tmp_path):
+    for size in (1, 50, 5, 20):
+        (tmp_path / f'{size}.py').write_text('#' * size)
+    project_files = sorted(tmp_path.iterdir())
+    scheduled = []
+
+    def scan(project_file):
+        scheduled.append(project_file.name)
+        return project_file.stat().st_size
+
+    with ThreadPoolExecutor(1) as pool:
+        mapped = list(largest_first_map(pool, scan, project_files, 1))
+    assert scheduled == ['50.py', '20.py', '5.py', '1.py']
+    assert mapped == [(project_file, project_file.stat().st_size) for project_file in project_files]
@@ -0,0 +1,21 @@
+import io
+
+from bonded.events import Events
+from bonded.module_inspection import ModuleInspection
+from bonded.progress import Progress
+
+
+def test_structured_progress(tmp_path):
+    for name in ['a.py', 'b.py']:
+        (tmp_path / name).write_text('import foo\n')
+    stream = io.StringIO()
+    with Progress(stream, interval=0) as progress:
+        files = progress.discover(sorted(tmp_path.iterdir()))
+        progress.start('imports', len(files))
+        ModuleInspection(events=Events([progress])).inspect_imports(files)
+
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == 'progress discovered=1'
+    assert lines[-1].startswith('progress discovered=2 scanner=imports scanned=2/2 ')
+    assert 'eta_seconds=0.0' in lines[-1]
+    assert progress.scanners['imports'].bytes == 2 * len('import foo\n')
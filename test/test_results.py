@@ -0,0 +1,139 @@
+import io
+import json
+import sys
+
+import pytest
+
+from bonded import _internal
+from bonded.__main__ import main
+from bonded._evidence import Location, parse_retention
+from bonded._results import FileResults, read_changed_files
+from bonded.executable_inspection import ExecutableInspection
+from bonded.settings import Settings
+
+
+def _run(monkeypatch, *arguments):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    monkeypatch.setattr(sys, 'argv', ['bonded', '--pyproject', '', '--report', 'none', *arguments])
+    return main()
+
+
+def test_changed_files(tmp_path, monkeypatch):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'a.py').write_text('import packaging\n')
+    (project / 'b.py').write_text('from tomli import loads\n')
+    (project / 'c.py').write_text('import tomli\n')
+    results_file = tmp_path / 'results.json'
+    arguments = ['--packages', 'packaging', 'tomli', '--results-file', str(results_file)]
+
+    assert _run(monkeypatch, *arguments, str(project)) == 0
+    saved = json.loads(results_file.read_text())
+    assert saved['files'] == {
+        'a.py': {'imports': [['packaging', 1, False]]},
+        'b.py': {'imports': [['tomli', 1, False]], 'names': ['tomli.loads']},
+        'c.py': {'imports': [['tomli', 1, False]]},
+    }
+
+    (project / 'b.py').write_text('import os\n')
+    (project / 'c.py').unlink()
+    changed = ['--changed-files', str(project / 'b.py'), str(project / 'c.py')]
+    assert _run(monkeypatch, *arguments, str(project), *changed) == 1
+    saved = json.loads(results_file.read_text())
+    assert saved['files'] == {
+        'a.py': {'imports': [['packaging', 1, False]]},
+        'b.py': {'imports': [['os', 1, False]]},
+    }
+
+
+def test_replay_executables(tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    results = FileResults(
+        str(tmp_path),
+        {
+            'a.py': {'imports': [['packaging', 1, False]]},
+            'sub/run.sh': {'executables': [['pip', 2, 'shell'], ['tox', 3, 'shell']]},
+        },
+        ['pip', 'tox'],
+    )
+    executables = ExecutableInspection(['pip'], parse_retention('all'))
+    results.replay_executables(executables)
+
+    assert list(executables['pip'].found_executions) == [Location('run.sh', 'shell', 2)]
+    assert 'tox' not in executables
+
+
+def test_changed_files_new_executable(tmp_path, monkeypatch):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'a.py').write_text('import packaging\n')
+    (project / 'tox.ini').write_text('[testenv]\ncommands = pytest\n')
+    results_file = tmp_path / 'results.json'
+    arguments = ['--results-file', str(results_file), '--evidence', 'all']
+    changed = ['--changed-files', str(project / 'a.py')]
+
+    assert _run(monkeypatch, '--packages', 'packaging', *arguments, str(project)) == 0
+    saved = json.loads(results_file.read_text())
+    assert saved['executables'] == []
+    assert 'tox.ini' not in saved['files']
+
+    # pytest is only used through its executable, which no unchanged file was searched for yet
+    packages = ['--packages', 'packaging', 'pytest']
+    assert _run(monkeypatch, *packages, *arguments, str(project), *changed) == 0
+    saved = json.loads(results_file.read_text())
+    assert 'pytest' in saved['executables']
+    assert [found[:2] for found in saved['files']['tox.ini']['executables']] == [['pytest', 2]]
+
+    # now that every file has been searched for it, it is replayed
+    assert _run(monkeypatch, *packages, *arguments, str(project), *changed) == 0
+    assert json.loads(results_file.read_text()) == saved
+
+
+def test_unusable_results(tmp_path):
+    results_file = tmp_path / 'results.json'
+    assert FileResults.load(results_file, str(tmp_path)) is None
+    FileResults(str(tmp_path)).save(results_file)
+    assert FileResults.load(results_file, str(tmp_path)).files == {}
+    assert list(tmp_path.glob('*.partial')) == []
+    assert FileResults.load(results_file, str(tmp_path / 'elsewhere')) is None
+    results_file.write_text(json.dumps({'version': 0}))
+    assert FileResults.load(results_file, str(tmp_path)) is None
+
+
+def test_read_changed_files():
+    stdin = io.StringIO('b.py\n\nc.py\n')
+    assert read_changed_files(['a.py', '-'], stdin) == ['a.py', 'b.py', 'c.py']
+
+
+def test_changed_files_needs_results(tmp_path):
+    with pytest.raises(ValueError):
+        Settings(search_path=str(tmp_path), changed_files={'a.py'})
+
+
+def test_shards_merge(tmp_path, monkeypatch, capsys):
+    project = tmp_path / 'project'
+    (project / 'sub').mkdir(parents=True)
+    for i in range(8):
+        (project / f'm{i}.py').write_text(f'import packaging.version\nimport missing{i % 3}\n')
+        (project / 'sub' / f's{i}.py').write_text('from packaging import markers\nrun bonded\n')
+    (project / 'tox.ini').write_text('commands = bonded\n')
+    arguments = ['--packages', 'packaging', 'bonded', '--report', 'jsonl', '--evidence', '2']
+
+    capsys.readouterr()
+    single = _run(monkeypatch, *arguments, str(project))
+    single_report = capsys.readouterr().out
+    partials = []
+    for shard in range(1, 4):
+        partials.append(str(tmp_path / f'shard{shard}.json'))
+        shard_arguments = ['--shard', f'{shard}/3', '--results-file', partials[-1]]
+        assert _run(monkeypatch, *arguments, *shard_arguments, str(project)) == 0
+    assert capsys.readouterr().out == ''
+    assert sum(len(json.loads(open(p).read())['files']) for p in partials) == 17
+
+    monkeypatch.setattr(sys, 'argv', ['bonded', 'merge', '--pyproject', '', *arguments, *partials])
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    assert main() == single
+    assert capsys.readouterr().out == single_report
+
+    with pytest.raises(ValueError):
+        FileResults.merge([partials[0], partials[0]])
@@ -1,5 +1,8 @@
 import os
 
+import pytest
+
+import bonded._importlib
 import bonded.settings
 from bonded.settings import CLISettings, Settings
 
@@ -144,3 +147,50 @@ def test_verbosity():
 def test_search_path():
     assert vars(CLISettings.parse_args(['path'])) == {'search_path': 'path'}
     assert vars(CLISettings.parse_args(['--', 'path'])) == {'search_path': 'path'}
+
+
+def test_shard():
+    assert bonded.settings.parse_shard('2/3') == (2, 3)
+    for shard in ('0/3', '4/3', '1', 'a/b'):
+        with pytest.raises(ValueError):
+            bonded.settings.parse_shard(shard)
+
+
+def test_targets():
+    assert Settings(targets={'sys_platform=linux'}).targets == {'sys_platform=linux'}
+    with pytest.raises(ValueError):
+        Settings(targets={'bogus=1'})
+
+
+def test_workers():
+    # only a run uses its workers, settings alone change nothing
+    Settings(workers=3)
+    assert bonded._importlib.current_environment.workers is None
+    for workers in (0, -1):
+        with pytest.raises(ValueError):
+            Settings(workers=workers)
+
+
+@pytest.mark.parametrize(
+    'option',
+    [
+        ['--shard', '4/3', '--results-file', 'results.json'],
+        ['--evidence', 'bogus'],
+        ['--targets', 'bogus=1'],
+        ['--workers', '0'],
+        ['--changed-files', 'a.py'],
+    ],
+)
+def test_bad_values(option, tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        Settings.from_interactive(['--pyproject', '', str(tmp_path), *option])
+    assert 'error:' in capsys.readouterr().err
+
+
+def test_image_pyproject(tmp_path, monkeypatch):
+    (tmp_path / 'pyproject.toml').write_text('[tool.bonded]\npackages = ["host-only"]\n')
+    monkeypatch.chdir(tmp_path)
+    # the host project's pyproject.toml is not the imaged project's
+    settings = Settings.from_interactive(['--image', 'image.tar', 'app'])
+    assert settings.pyproject is None
+    assert 'host-only' not in settings.packages
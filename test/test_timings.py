@@ -0,0 +1,62 @@
+import json
+import tracemalloc
+
+from bonded.events import Events
+from bonded.module_inspection import ModuleInspection
+from bonded.timings import Timings
+
+
+def test_phases():
+    timings = Timings()
+    with timings.phase('scan'):
+        pass
+    with timings.phase('scan'):
+        pass
+    with timings.phase('report'):
+        pass
+
+    assert list(timings.phases) == ['scan', 'report']
+    assert all(wall >= 0 and cpu >= 0 for wall, cpu in timings.phases.values())
+    cpu = timings.phases['scan'][1]
+    timings.add_cpu('scan', 2.0)
+    assert timings.phases['scan'][1] == cpu + 2.0
+
+
+def test_slowest_files():
+    timings = Timings(slowest=2)
+    for name, seconds in [('a.py', 0.2), ('b.py', 0.1), ('c.py', 0.3), ('d.py', 0.05)]:
+        timings.file_scanned('imports', name, seconds, 100)
+
+    scanner = timings.scanners['imports']
+    assert scanner.files == 4
+    assert scanner.bytes == 400
+    assert scanner.slowest == [('c.py', 0.3), ('a.py', 0.2)]
+    assert json.loads(json.dumps(timings.as_dict()))['scanners']['imports']['files'] == 4
+
+
+def test_scanner_timings(tmp_path):
+    (tmp_path / 'main.py').write_text('import foo\n')
+    timings = Timings()
+    ModuleInspection(events=Events([timings])).inspect_imports([tmp_path / 'main.py'])
+
+    scanner = timings.scanners['imports']
+    assert scanner.files == 1
+    assert scanner.bytes == len('import foo\n')
+    assert [name for name, _ in scanner.slowest] == [str(tmp_path / 'main.py')]
+
+
+def test_memory_profile():
+    timings = Timings()
+    timings.start_memory_profile()
+    try:
+        with timings.phase('allocate'):
+            kept = [object() for _ in range(10_000)]
+            list(range(100_000))
+    finally:
+        tracemalloc.stop()
+
+    memory = timings.memory['allocate']
+    assert memory.peak > memory.retained > 0
+    assert memory.top and all(size > 0 for _, size, _ in memory.top)
+    assert timings.as_dict()['memory']['allocate']['retained_bytes'] == memory.retained
+    del kept
@@ -0,0 +1,115 @@
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+from bonded import _internal
+from bonded.__main__ import main
+from bonded.evaluation import Evaluation
+from bonded.executable_inspection import ExecutableInspection
+from bonded.module_inspection import ModuleInspection
+from bonded.package_inspection import PackageInspection
+from bonded.settings import Settings
+from bonded.writers import JSONLinesWriter, open_output, SarifWriter
+
+
+@pytest.fixture()
+def evaluation(tmp_path, monkeypatch):
+    monkeypatch.setattr(_internal, '_record_cache', {})
+    (tmp_path / 'main.py').write_text('import os\nimport not_required\n')
+    (tmp_path / 'requirements.txt').write_text('packaging\n')
+    modules = ModuleInspection()
+    modules.inspect_imports([tmp_path / 'main.py'])
+    packages = PackageInspection([])
+    packages.update_from_pip_requirements(tmp_path / 'requirements.txt')
+    return Evaluation(
+        packages, modules, ExecutableInspection([]), Settings(search_path=str(tmp_path))
+    )
+
+
+def test_jsonl(evaluation, tmp_path):
+    stream = io.StringIO()
+    writer = JSONLinesWriter(stream)
+    writer.write(evaluation)
+    writer.close()
+
+    package, module = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert package['kind'] == 'package'
+    assert package['name'] == 'packaging'
+    assert package['confidence'] == 'NONE'
+    assert package['required_by'] == [str(tmp_path / 'requirements.txt')]
+    assert module['kind'] == 'module'
+    assert module['name'] == 'not_required'
+    assert module['locations'] == [{'file': str(tmp_path / 'main.py'), 'line': 2}]
+
+
+def test_sarif(evaluation, tmp_path):
+    stream = io.StringIO()
+    writer = SarifWriter(stream)
+    writer.write(evaluation)
+    writer.write(evaluation)
+    writer.close()
+
+    [run] = json.loads(stream.getvalue())['runs']
+    assert run['tool']['driver']['name'] == 'bonded'
+    assert [result['ruleId'] for result in run['results']] == [
+        'unused-package',
+        'module-without-package',
+    ] * 2
+    location = run['results'][1]['locations'][0]['physicalLocation']
+    assert location['artifactLocation']['uri'] == (tmp_path / 'main.py').as_posix()
+    assert location['region'] == {'startLine': 2}
+
+
+def test_open_output(evaluation, tmp_path):
+    report = tmp_path / 'report.sarif'
+    report.write_text('earlier')
+    with pytest.raises(RuntimeError):
+        with open_output(str(report)) as stream:
+            SarifWriter(stream).write(evaluation)
+            raise RuntimeError('evaluation failed')
+    # neither the earlier report nor a partial one is left truncated
+    assert report.read_text() == 'earlier'
+    assert list(tmp_path.glob('*.partial')) == []
+
+    with open_output(str(report)) as stream:
+        writer = SarifWriter(stream)
+        writer.write(evaluation)
+        writer.close()
+    assert json.loads(report.read_text())['runs'][0]['results']
+    assert stream.closed
+
+    # runs writing the same report at once each have a partial file of their own
+    with open_output(str(report)) as first:
+        with open_output(str(report)) as second:
+            second.write('second')
+        first.write('first')
+    assert report.read_text() == 'first'
+    assert list(tmp_path.glob('*.partial')) == []
+
+
+def test_output_not_scanned(tmp_path, monkeypatch):
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'main.py').write_text('import packaging\n')
+    report = project / 'report.jsonl'
+    arguments = ['bonded', '--pyproject', '', '--packages', 'packaging', 'pytest']
+    arguments += ['--report', 'jsonl', '--output', str(report), str(project)]
+    monkeypatch.setattr(sys, 'argv', arguments)
+
+    for _ in range(2):
+        monkeypatch.setattr(_internal, '_record_cache', {})
+        # the report names pytest, which must not count as running it
+        assert main() == 1
+        assert [json.loads(line)['name'] for line in report.read_text().splitlines()] == [
+            'pytest'
+        ]
+
+
+def test_writers_do_not_import_rich():
+    subprocess.run(
+        [sys.executable, '-c', 'import sys, bonded.writers; assert "rich" not in sys.modules'],
+        check=True,
+    )